@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser as BaseTokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import user_cache
+
+# JWT_STATELESS_READS lets views that only need the caller's id authenticate
+# read requests from the token claims alone.
+JWT_STATELESS_READS = getattr(settings, 'JWT_STATELESS_READS', False)
+
+
+class TokenUser(BaseTokenUser):
+    """
+    TokenUser whose `id` is the integer primary key, so it compares equal to
+    foreign key values such as `event.organizer_id`. Simple JWT stores the
+    claim as a string.
+    """
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that serves the user row (with its profile) from the
+    in-process user cache when USER_CACHE_SIZE is set.
+    """
+
+    def get_user(self, validated_token):
+        if not user_cache.enabled:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('profile').get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            user_cache.set(user_id, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+
+class StatelessReadJWTAuthentication(CachedJWTAuthentication):
+    """
+    With JWT_STATELESS_READS on, safe-method requests get a TokenUser built
+    from the claims and never touch auth_user. Only use it on views whose
+    read path needs nothing but `request.user.id`. Writes still load the
+    full user.
+
+    A user deactivated in this process is rejected straight away, because
+    the user cache keeps their inactive row. Elsewhere, stateless reads stop
+    once the access token expires.
+    """
+
+    def authenticate(self, request):
+        self.stateless = JWT_STATELESS_READS and request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if not self.stateless:
+            return super().get_user(validated_token)
+
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        cached = user_cache.get(validated_token[api_settings.USER_ID_CLAIM])
+        if cached is not None and api_settings.CHECK_USER_IS_ACTIVE and not cached.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return api_settings.TOKEN_USER_CLASS(validated_token)
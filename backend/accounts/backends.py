@@ -0,0 +1,72 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+
+UserModel = get_user_model()
+
+# Password hashing is deliberately slow. The async login path runs it on
+# this pool so it never holds up the event loop; hashlib releases the GIL
+# while it works.
+PASSWORD_CHECK_WORKERS = getattr(settings, 'PASSWORD_CHECK_WORKERS', 4)
+password_check_pool = ThreadPoolExecutor(max_workers=PASSWORD_CHECK_WORKERS, thread_name_prefix='password-check')
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    Authenticate with either a username or an email address. The user is
+    found with one indexed lookup that also loads their profile, so the
+    login response needs no further queries.
+    """
+
+    def get_login_queryset(self, username=None, email=None):
+        if username:
+            condition = Q(username=username)
+            if '@' in username:
+                condition |= Q(email=username)
+        elif email:
+            condition = Q(email=email)
+        else:
+            return None
+        return UserModel._default_manager.filter(condition).select_related('profile').order_by('id')
+
+    def pick_user(self, candidates, username):
+        # An exact username match wins over an email match. Emails are not
+        # unique, so the oldest account with that email is used otherwise.
+        for user in candidates:
+            if user.get_username() == username:
+                return user
+        return candidates[0] if candidates else None
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        queryset = self.get_login_queryset(username, email)
+        if queryset is None or password is None:
+            return None
+
+        user = self.pick_user(list(queryset), username)
+        if user is None:
+            # Hash anyway so unknown accounts take as long as wrong passwords.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, email=None):
+        queryset = self.get_login_queryset(username, email)
+        if queryset is None or password is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        user = self.pick_user([user async for user in queryset], username)
+        if user is None:
+            await loop.run_in_executor(password_check_pool, UserModel().set_password, password)
+            return None
+        if await loop.run_in_executor(password_check_pool, user.check_password, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,68 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+# In-process LRU cache of authenticated user rows (with their profile), so
+# JWT authentication can skip the auth_user lookup on repeat requests.
+# Entries expire after USER_CACHE_TIMEOUT seconds and are evicted as soon as
+# the user or their profile is saved in this process; other processes pick
+# the change up when their own entry expires. Disabled when USER_CACHE_SIZE
+# is 0.
+
+USER_CACHE_SIZE = getattr(settings, 'USER_CACHE_SIZE', 0)
+USER_CACHE_TIMEOUT = getattr(settings, 'USER_CACHE_TIMEOUT', 60)
+
+
+class UserCache:
+    """
+    Bounded LRU mapping of user id to user row with a per-entry TTL.
+    Callers always get their own deep copy, profile included, so a request
+    can modify the user it was given without affecting anyone else.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(user)
+
+    def set(self, user_id, user):
+        if not self.enabled:
+            return
+        key = str(user_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, copy.deepcopy(user))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TIMEOUT)
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+# Profile pictures are streamed to disk in chunks and stored under their
+# content hash, so the same image uploaded twice is kept once. WebP
+# thumbnails in fixed sizes are written next to the original by a local
+# process pool after the upload is committed; the request never waits for
+# them. With THUMBNAIL_WORKERS = 0 they are rendered inline instead.
+
+PICTURE_DIR = 'profile_pictures'
+THUMBNAIL_SIZES = getattr(settings, 'PROFILE_THUMBNAIL_SIZES', (64, 128, 256))
+THUMBNAIL_WORKERS = getattr(settings, 'THUMBNAIL_WORKERS', 2)
+THUMBNAIL_QUALITY = 80
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+
+def store_upload(upload):
+    """
+    Write an uploaded file to disk chunk by chunk while hashing it, and
+    return its storage name. A file with the same content that is already
+    stored is reused.
+    """
+    directory = default_storage.path(PICTURE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            for chunk in upload.chunks():
+                digest.update(chunk)
+                temp_file.write(chunk)
+
+        hexdigest = digest.hexdigest()
+        extension = os.path.splitext(upload.name)[1].lower() or '.img'
+        name = f'{PICTURE_DIR}/{hexdigest[:2]}/{hexdigest}{extension}'
+        path = default_storage.path(name)
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+        return name
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def thumbnail_name(name, size):
+    return f'{os.path.splitext(name)[0]}_{size}.webp'
+
+
+def thumbnail_urls(name, request=None):
+    if not name:
+        return None
+    urls = {}
+    for size in THUMBNAIL_SIZES:
+        url = default_storage.url(thumbnail_name(name, size))
+        urls[str(size)] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def render_thumbnails(source_path, targets):
+    """
+    Render `targets` ({size: path}) from the image at `source_path`. Runs in
+    the worker processes, so it only takes plain paths.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        for size, path in targets.items():
+            thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            temp_path = f'{path}.{os.getpid()}.part'
+            thumbnail.save(temp_path, 'WEBP', quality=THUMBNAIL_QUALITY, method=4)
+            os.replace(temp_path, path)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: the parent holds database connections and
+        # server threads that a forked child must not inherit.
+        _pool = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def schedule_thumbnails(name):
+    """
+    Queue the missing thumbnails for a stored picture.
+    """
+    targets = {}
+    for size in THUMBNAIL_SIZES:
+        path = default_storage.path(thumbnail_name(name, size))
+        if not os.path.exists(path):
+            targets[size] = path
+    if not targets:
+        return
+    source_path = default_storage.path(name)
+    if THUMBNAIL_WORKERS:
+        future = _get_pool().submit(render_thumbnails, source_path, targets)
+        future.add_done_callback(lambda done: _log_failure(done, name))
+    else:
+        try:
+            render_thumbnails(source_path, targets)
+        except Exception as e:
+            logger.error(f"Thumbnail generation failed for {name}: {str(e)}")
+
+
+def _log_failure(future, name):
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Thumbnail generation failed for {name}: {error}")
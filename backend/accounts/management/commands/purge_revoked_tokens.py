@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from accounts.revocation import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked-token rows whose tokens have expired. Run periodically, e.g. hourly from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired revoked tokens'))
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        # After the last auth_user change: SQLite rebuilds the table on
+        # ALTER, which would drop an index created earlier.
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        # auth_user belongs to django.contrib.auth, so the index that email
+        # logins rely on is created here.
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS auth_user_email_idx ON auth_user (email)',
+            'DROP INDEX IF EXISTS auth_user_email_idx',
+        ),
+    ]
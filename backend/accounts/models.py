@@ -1,7 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from .cache import user_cache
+from .images import schedule_thumbnails
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -18,12 +21,46 @@ class UserProfile(models.Model):
     class Meta:
         db_table = 'user_profiles'
 
+class RevokedToken(models.Model):
+    """
+    A revoked JWT, kept only until the token would have expired anyway
+    (see the purge_revoked_tokens command).
+    """
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+    class Meta:
+        db_table = 'revoked_tokens'
+
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
-        UserProfile.objects.create(user=instance)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    # Registration sets `_profile_defaults` so the profile is inserted with
+    # its initial values instead of being updated straight afterwards.
+    if created and not raw:
+        UserProfile.objects.create(user=instance, **getattr(instance, '_profile_defaults', {}))
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    # Keep deactivated users cached so stateless reads reject them too.
+    if kwargs.get('created') is not None and not instance.is_active:
+        user_cache.set(instance.pk, instance)
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def evict_cached_profile_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.user_id)
+
+@receiver(post_save, sender=UserProfile)
+def thumbnail_profile_picture(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or not instance.profile_picture:
+        return
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    name = instance.profile_picture.name
+    transaction.on_commit(lambda: schedule_thumbnails(name))
@@ -0,0 +1,146 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from project.db.replicas import primary_reads
+
+from .models import RevokedToken
+
+# Revoked JWT ids live in the `revoked_tokens` table until they expire. Each
+# process keeps a Bloom filter of the unexpired ids in front of it, so the
+# check for a token that was never revoked (nearly every check) is answered
+# in memory. Only filter hits are confirmed against the table. The filter
+# picks up revocations made by other processes every
+# REVOKED_TOKENS_SYNC_INTERVAL seconds and is rebuilt from scratch every
+# REVOKED_TOKENS_REBUILD_INTERVAL seconds so expired ids drop out of it.
+# Both read the primary: an incremental load from a lagging replica would
+# move past revocations the replica has not received yet.
+
+BLOOM_CAPACITY = getattr(settings, 'REVOKED_TOKENS_BLOOM_CAPACITY', 1000000)
+BLOOM_ERROR_RATE = getattr(settings, 'REVOKED_TOKENS_BLOOM_ERROR_RATE', 0.001)
+SYNC_INTERVAL = getattr(settings, 'REVOKED_TOKENS_SYNC_INTERVAL', 5)
+REBUILD_INTERVAL = getattr(settings, 'REVOKED_TOKENS_REBUILD_INTERVAL', 3600)
+LOAD_CHUNK_SIZE = 10000
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings, sized for `capacity` entries at
+    the given false-positive rate.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationStore:
+    """
+    The process-wide view of revoked token ids: the table plus the Bloom
+    filter in front of it.
+    """
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE,
+                 sync_interval=SYNC_INTERVAL, rebuild_interval=REBUILD_INTERVAL):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the in-memory state; the next check reloads it.
+        """
+        self._filter = None
+        self._built_at = self._synced_at = 0.0
+        self._loaded_since = None
+
+    def _load(self, bloom, since=None):
+        queryset = RevokedToken.objects.filter(expires_at__gt=timezone.now())
+        if since is not None:
+            queryset = queryset.filter(revoked_at__gte=since)
+        with primary_reads():
+            for jti in queryset.values_list('jti', flat=True).iterator(chunk_size=LOAD_CHUNK_SIZE):
+                bloom.add(jti)
+
+    def _sync(self):
+        now = time.monotonic()
+        if self._filter is not None and now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # Revocations committed late can carry a revoked_at slightly in
+            # the past, so each incremental load overlaps the previous one.
+            started = timezone.now() - timedelta(seconds=self.sync_interval)
+            rebuild = (
+                self._filter is None
+                or now - self._built_at >= self.rebuild_interval
+                or self._filter.count > self.capacity
+            )
+            if rebuild:
+                bloom = BloomFilter(self.capacity, self.error_rate)
+                self._load(bloom)
+                self._filter = bloom
+                self._built_at = now
+            elif now - self._synced_at >= self.sync_interval:
+                self._load(self._filter, since=self._loaded_since)
+            self._loaded_since = started
+            self._synced_at = now
+
+    def revoke(self, jti, expires_at):
+        if expires_at <= timezone.now():
+            return
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=jti, expires_at=expires_at)],
+            ignore_conflicts=True,
+        )
+        if self._filter is not None:
+            with self._lock:
+                self._filter.add(jti)
+
+    def is_revoked(self, jti):
+        self._sync()
+        if jti not in self._filter:
+            return False
+        with primary_reads():
+            return RevokedToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).exists()
+
+
+def purge_expired(batch_size=LOAD_CHUNK_SIZE):
+    """
+    Delete the rows of tokens that have expired, in batches so a large
+    backlog does not hold one long write lock. Returns the number deleted.
+    """
+    deleted = 0
+    now = timezone.now()
+    while True:
+        batch = list(RevokedToken.objects.filter(expires_at__lte=now).values_list('jti', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += RevokedToken.objects.filter(jti__in=batch).delete()[0]
+
+
+revocation_store = RevocationStore()
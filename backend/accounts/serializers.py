@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt import serializers as jwt_serializers
+from .images import store_upload, thumbnail_urls
 from .models import UserProfile
+from .tokens import RefreshToken
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
@@ -21,39 +25,67 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         validated_data.pop('confirm_password')
         full_name = validated_data.pop('full_name', '')
         
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password'],
+        # Same as User.objects.create_user, but the profile is created with
+        # its full name by create_user_profile: two INSERTs in one transaction.
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data['email']),
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', '')
         )
+        user.set_password(validated_data['password'])
+        user._profile_defaults = {'full_name': full_name}
         
-        user.profile.full_name = full_name
-        user.profile.save()
+        with transaction.atomic():
+            user.save()
         
         return user
 
+def assign_changed(instance, values):
+    """
+    Set the given attributes on `instance` and return the names of those
+    whose value differs from what it had.
+    """
+    changed = []
+    for attr, value in values.items():
+        if getattr(instance, attr) != value:
+            setattr(instance, attr, value)
+            changed.append(attr)
+    return changed
+
 class UserProfileSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.EmailField(source='user.email', read_only=True)
     first_name = serializers.CharField(source='user.first_name')
     last_name = serializers.CharField(source='user.last_name')
+    profile_thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
-        fields = ('id', 'username', 'email', 'first_name', 'last_name', 'full_name', 'bio', 'location', 'profile_picture')
+        fields = ('id', 'username', 'email', 'first_name', 'last_name', 'full_name', 'bio', 'location',
+                  'profile_picture', 'profile_thumbnails')
+
+    def get_profile_thumbnails(self, obj):
+        return thumbnail_urls(obj.profile_picture.name, self.context.get('request'))
 
     def update(self, instance, validated_data):
         user_data = validated_data.pop('user', {})
         
-        for attr, value in user_data.items():
-            setattr(instance.user, attr, value)
-        instance.user.save()
+        # Store new uploads under their content hash; re-uploading the
+        # current picture then leaves the row untouched.
+        picture = validated_data.get('profile_picture')
+        if picture:
+            validated_data['profile_picture'] = store_upload(picture)
         
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        # Only write the rows, and the columns, that actually changed.
+        user_fields = assign_changed(instance.user, user_data)
+        profile_fields = assign_changed(instance, validated_data)
+        
+        with transaction.atomic():
+            if user_fields:
+                instance.user.save(update_fields=user_fields)
+            if profile_fields:
+                instance.save(update_fields=profile_fields + ['updated_at'])
         
         return instance
 
@@ -63,3 +95,7 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'profile')
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    # Checks the revocation store, and revokes the old token on rotation.
+    token_class = RefreshToken
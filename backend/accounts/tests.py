@@ -1,3 +1,451 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.utils import ConnectionDoesNotExist
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from events.models import Event, Review
+from project.db import replicas
+from project.testing import bearer
+from rest_framework.test import APIClient
+
+from .authentication import TokenUser
+from .cache import UserCache, user_cache
+from .images import THUMBNAIL_SIZES, store_upload, thumbnail_name
+from .models import RevokedToken, UserProfile
+from .revocation import BloomFilter, RevocationStore, purge_expired
+from .tokens import AccessToken, RefreshToken
+
+# The authentication lookup loads the profile along with the user.
+AUTH_LOOKUP = f'FROM "auth_user" LEFT OUTER JOIN "{UserProfile._meta.db_table}"'
+
+
+class UserCacheTests(TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = UserCache(max_size=2, timeout=60)
+        cache.set(1, 'first')
+        cache.set(2, 'second')
+        cache.get(1)
+        cache.set(3, 'third')
+        self.assertEqual(cache.get(1), 'first')
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(3), 'third')
+
+    def test_entries_expire(self):
+        cache = UserCache(max_size=2, timeout=60)
+        with mock.patch('accounts.cache.time.monotonic', return_value=1000.0):
+            cache.set(1, 'first')
+        with mock.patch('accounts.cache.time.monotonic', return_value=1059.0):
+            self.assertEqual(cache.get(1), 'first')
+        with mock.patch('accounts.cache.time.monotonic', return_value=1060.0):
+            self.assertIsNone(cache.get(1))
+
+    def test_callers_get_their_own_copy(self):
+        cache = UserCache(max_size=2, timeout=60)
+        user = User(pk=1, username='alice')
+        cache.set(user.pk, user)
+        cache.get('1').username = 'mallory'
+        self.assertEqual(cache.get(1).username, 'alice')
+
+    def test_copies_include_the_profile(self):
+        cache = UserCache(max_size=2, timeout=60)
+        user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        UserProfile.objects.update_or_create(user=user, defaults={'full_name': 'Alice'})
+        user = User.objects.select_related('profile').get(pk=user.pk)
+        cache.set(user.pk, user)
+
+        first = cache.get(user.pk)
+        first.profile.full_name = 'Mallory'
+        self.assertEqual(user.profile.full_name, 'Alice')
+        second = cache.get(user.pk)
+        self.assertEqual(second.profile.full_name, 'Alice')
+        self.assertIs(second.profile.user, second)
+
+    def test_disabled_when_size_is_zero(self):
+        cache = UserCache(max_size=0, timeout=60)
+        cache.set(1, 'first')
+        self.assertIsNone(cache.get(1))
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(user_cache, 'max_size', 10)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(user_cache.clear)
+        user_cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'a-Strong-passw0rd')
+        self.client = APIClient()
+        self.auth = bearer(self.user)
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/profile/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        lookups = [query['sql'] for query in queries.captured_queries if AUTH_LOOKUP in query['sql']]
+        return response, lookups
+
+    def test_repeat_requests_skip_the_user_query(self):
+        self.assertEqual(len(self.user_queries()[1]), 1)
+        self.assertEqual(self.user_queries()[1], [])
+
+    def test_saving_the_user_or_profile_evicts_it(self):
+        self.user_queries()
+        self.user.first_name = 'Alice'
+        self.user.save()
+        self.assertIsNone(user_cache.get(self.user.pk))
+        response, queries = self.user_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data['first_name'], 'Alice')
+
+        profile = UserProfile.objects.get(user=self.user)
+        profile.full_name = 'Alice Example'
+        profile.save()
+        self.assertIsNone(user_cache.get(self.user.pk))
+        response, queries = self.user_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data['full_name'], 'Alice Example')
+
+    def test_deactivated_user_stays_cached_and_is_rejected(self):
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(user_cache.get(self.user.pk).is_active)
+        response = self.client.get('/api/auth/profile/', headers=self.auth)
+        self.assertEqual(response.status_code, 401)
+
+
+class StatelessReadTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch('accounts.authentication.JWT_STATELESS_READS', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(user_cache.clear)
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'a-Strong-passw0rd')
+        self.client = APIClient()
+        self.auth = bearer(self.user)
+
+    def user_lookups(self, method, path, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, format='json', **kwargs, headers=self.auth)
+        lookups = [query['sql'] for query in queries.captured_queries if 'FROM "auth_user" WHERE' in query['sql']]
+        return response, lookups
+
+    def test_safe_methods_use_the_token_claims(self):
+        response, lookups = self.user_lookups('get', '/api/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(lookups, [])
+        self.assertIsInstance(response.wsgi_request.user, TokenUser)
+        self.assertEqual(response.wsgi_request.user.id, self.user.pk)
+
+    def test_unsafe_methods_load_the_user(self):
+        response, lookups = self.user_lookups('post', '/api/events/', data={
+            'title': 'Meetup', 'description': 'Meetup', 'location': 'Berlin',
+            'start_time': '2030-01-01T10:00:00Z', 'end_time': '2030-01-01T12:00:00Z',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(lookups), 1)
+        self.assertIsInstance(response.wsgi_request.user, User)
+        self.assertEqual(response.data['organizer'], 'alice')
+
+    def test_views_without_stateless_reads_load_the_user(self):
+        response, lookups = self.user_lookups('get', '/api/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(lookups)
+        self.assertIsInstance(response.wsgi_request.user, User)
+
+    def test_cached_inactive_user_is_rejected(self):
+        with mock.patch.object(user_cache, 'max_size', 10):
+            self.user.is_active = False
+            self.user.save()
+            response = self.client.get('/api/events/', headers=self.auth)
+        self.assertEqual(response.status_code, 401)
+
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def writes(queries):
+    return [query['sql'] for query in queries if query['sql'].lstrip().upper().startswith(WRITE_STATEMENTS)]
+
+
+class RegistrationWritesTests(TestCase):
+    def test_registration_inserts_user_and_profile_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().post('/api/auth/register/', {
+                'username': 'alice',
+                'email': 'alice@example.com',
+                'password': 'a-Strong-passw0rd',
+                'confirm_password': 'a-Strong-passw0rd',
+                'full_name': 'Alice Example',
+            }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        statements = writes(queries.captured_queries)
+        self.assertEqual(len(statements), 2, statements)
+        self.assertTrue(statements[0].startswith('INSERT INTO "auth_user"'))
+        self.assertTrue(statements[1].startswith('INSERT INTO "user_profiles"'))
+        self.assertEqual(UserProfile.objects.get(user__username='alice').full_name, 'Alice Example')
+        self.assertEqual(response.data['user']['profile']['full_name'], 'Alice Example')
+
+
+class ProfileUpdateWritesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('bob', 'bob@example.com', 'pw', first_name='Bob')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def patch(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch('/api/auth/profile/', data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return writes(queries.captured_queries)
+
+    def test_unchanged_patch_writes_nothing(self):
+        self.assertEqual(self.patch({'first_name': 'Bob', 'bio': None}), [])
+
+    def test_profile_only_patch_updates_changed_columns(self):
+        statements = self.patch({'bio': 'Hello'})
+        self.assertEqual(len(statements), 1, statements)
+        self.assertTrue(statements[0].startswith('UPDATE "user_profiles" SET "bio" = '))
+        self.assertEqual(UserProfile.objects.get(user=self.user).bio, 'Hello')
+
+    def test_user_and_profile_patch_writes_each_row_once(self):
+        statements = self.patch({'first_name': 'Robert', 'location': 'Berlin'})
+        self.assertEqual(len(statements), 2, statements)
+        self.assertTrue(statements[0].startswith('UPDATE "auth_user" SET "first_name" = '))
+        self.assertTrue(statements[1].startswith('UPDATE "user_profiles" SET "location" = '))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Robert')
+
+    def test_saving_user_does_not_rewrite_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save(update_fields=['last_login'])
+        self.assertEqual(len(writes(queries.captured_queries)), 1)
+
+
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        added = [f'added-{i}' for i in range(1000)]
+        for key in added:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in added))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class RevocationStoreTests(TestCase):
+    def setUp(self):
+        self.store = RevocationStore(capacity=1000, error_rate=0.01, sync_interval=5, rebuild_interval=3600)
+        self.expires = timezone.now() + timedelta(hours=1)
+
+    def test_revoked_ids_are_found(self):
+        self.assertFalse(self.store.is_revoked('first'))
+        self.store.revoke('first', self.expires)
+        self.assertTrue(self.store.is_revoked('first'))
+        self.assertFalse(self.store.is_revoked('second'))
+        # Revoking twice is harmless.
+        self.store.revoke('first', self.expires)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+    def test_expired_tokens_are_not_stored(self):
+        self.store.revoke('old', timezone.now() - timedelta(seconds=1))
+        self.assertFalse(RevokedToken.objects.exists())
+        self.assertFalse(self.store.is_revoked('old'))
+
+    def test_filter_misses_are_answered_in_memory(self):
+        self.store.revoke('first', self.expires)
+        self.store.is_revoked('first')
+        with self.assertNumQueries(0):
+            self.assertFalse(self.store.is_revoked('second'))
+
+    def test_filter_hits_are_confirmed_in_the_table(self):
+        self.store.is_revoked('warm-up')
+        # A filter that matches everything stands in for a false positive.
+        with mock.patch.object(BloomFilter, '__contains__', return_value=True):
+            with self.assertNumQueries(1):
+                self.assertFalse(self.store.is_revoked('never-revoked'))
+        # Expired rows do not count as revoked either.
+        RevokedToken.objects.create(jti='expired', expires_at=timezone.now() - timedelta(seconds=1))
+        with mock.patch.object(BloomFilter, '__contains__', return_value=True):
+            self.assertFalse(self.store.is_revoked('expired'))
+
+    def test_revocations_from_other_processes_are_picked_up(self):
+        with mock.patch('accounts.revocation.time.monotonic', return_value=1000.0):
+            self.assertFalse(self.store.is_revoked('elsewhere'))
+            RevokedToken.objects.create(jti='elsewhere', expires_at=self.expires)
+            self.assertFalse(self.store.is_revoked('elsewhere'))
+        with mock.patch('accounts.revocation.time.monotonic', return_value=1005.0):
+            self.assertTrue(self.store.is_revoked('elsewhere'))
+
+    def test_checks_read_the_primary_during_replica_requests(self):
+        self.store.revoke('first', self.expires)
+        token = replicas._replica.set('replica1')
+        try:
+            # The test database has no replica: reads routed to one fail.
+            self.assertTrue(self.store.is_revoked('first'))
+            self.store.reset()
+            self.assertTrue(self.store.is_revoked('first'))
+        finally:
+            replicas._replica.reset(token)
+
+    def test_purge_expired(self):
+        now = timezone.now()
+        for i in range(5):
+            RevokedToken.objects.create(jti=f'expired-{i}', expires_at=now - timedelta(minutes=i + 1))
+        RevokedToken.objects.create(jti='current', expires_at=self.expires)
+        self.assertEqual(purge_expired(batch_size=2), 5)
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['current'])
+        out = io.StringIO()
+        call_command('purge_revoked_tokens', stdout=out)
+        self.assertIn('Purged 0', out.getvalue())
+
+
+class LogoutTests(TestCase):
+    def test_logout_revokes_both_tokens(self):
+        user = User.objects.create_user('alice', 'alice@example.com', 'a-Strong-passw0rd')
+        refresh = RefreshToken.for_user(user)
+        access = str(refresh.access_token)
+        client = APIClient()
+        response = client.post(
+            '/api/auth/logout/', {'refresh_token': str(refresh)}, format='json', HTTP_AUTHORIZATION=f'Bearer {access}',
+        )
+        self.assertEqual(response.status_code, 205)
+        response = client.get('/api/auth/profile/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 401)
+        response = client.post('/api/auth/token/refresh/', {'refresh': str(refresh)}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+def png(color):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ProfilePictureTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media = media.name
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'a-Strong-passw0rd')
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media)
+            for root, _, names in os.walk(self.media) for name in names
+        )
+
+    def test_same_content_is_stored_once(self):
+        first = store_upload(SimpleUploadedFile('Me.PNG', png('red')))
+        second = store_upload(SimpleUploadedFile('copy.png', png('red')))
+        other = store_upload(SimpleUploadedFile('other.png', png('blue')))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith('profile_pictures/') and first.endswith('.png'))
+        # No partial files are left behind.
+        self.assertEqual(self.stored_files(), sorted([first, other]))
+
+    @mock.patch('accounts.images.THUMBNAIL_WORKERS', 0)
+    def test_upload_renders_thumbnails_and_serializers_link_them(self):
+        from PIL import Image
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(
+                '/api/auth/profile/', {'profile_picture': SimpleUploadedFile('me.png', png('red'))}, format='multipart',
+            )
+        self.assertEqual(response.status_code, 200)
+        name = UserProfile.objects.get(user=self.user).profile_picture.name
+        thumbnails = response.data['profile_thumbnails']
+        self.assertEqual(set(thumbnails), {str(size) for size in THUMBNAIL_SIZES})
+        for size in THUMBNAIL_SIZES:
+            self.assertEqual(thumbnails[str(size)], f'http://testserver/media/{thumbnail_name(name, size)}')
+            with Image.open(os.path.join(self.media, thumbnail_name(name, size))) as image:
+                self.assertEqual((image.format, image.size), ('WEBP', (size, size)))
+
+        # Uploading the same picture again changes nothing.
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            client.patch(
+                '/api/auth/profile/', {'profile_picture': SimpleUploadedFile('again.png', png('red'))},
+                format='multipart',
+            )
+        self.assertEqual(callbacks, [])
+
+        bob = User.objects.create_user('bob', 'bob@example.com', 'a-Strong-passw0rd')
+        event = Event.objects.create(
+            title='Meetup', description='Meetup', organizer=bob, location='Berlin',
+            start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=1),
+        )
+        Review.objects.create(event=event, user=self.user, rating=5)
+        Review.objects.create(event=event, user=bob, rating=4)
+        reviews = {item['user']: item for item in client.get(f'/api/events/{event.pk}/reviews/').data['results']}
+        self.assertEqual(reviews['alice']['user_thumbnails'], thumbnails)
+        self.assertIsNone(reviews['bob']['user_thumbnails'])
+
+
+@mock.patch('project.db.replicas.REPLICAS', ['replica1'])
+class ReplicaStickinessTests(TestCase):
+    """
+    Issuing tokens makes their user read from the primary, which has their
+    row even when a replica does not yet. The test database has no replica,
+    so a read routed to one fails.
+    """
+    password = 'a-Strong-passw0rd'
+
+    def setUp(self):
+        cache.clear()
+
+    def assertDashboardLoads(self, access):
+        response = APIClient().get('/api/dashboard/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_registration(self):
+        response = APIClient().post('/api/auth/register/', {
+            'username': 'alice',
+            'email': 'alice@example.com',
+            'password': self.password,
+            'confirm_password': self.password,
+            'full_name': 'Alice Example',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertDashboardLoads(response.data['tokens']['access'])
+
+    def test_login_and_token_views(self):
+        User.objects.create_user('alice', 'alice@example.com', self.password)
+        credentials = {'username': 'alice', 'password': self.password}
+        response = APIClient().post('/api/auth/login/', credentials, format='json')
+        self.assertDashboardLoads(response.data['tokens']['access'])
+
+        cache.clear()
+        response = APIClient().post('/api/auth/async/login/', credentials, format='json')
+        self.assertDashboardLoads(response.json()['tokens']['access'])
+
+        cache.clear()
+        response = APIClient().post('/api/auth/token/', credentials, format='json')
+        self.assertDashboardLoads(response.data['access'])
+
+        cache.clear()
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': response.data['refresh']}, format='json')
+        self.assertDashboardLoads(response.data['access'])
+
+    def test_without_fresh_tokens_reads_use_the_replica(self):
+        user = User.objects.create_user('alice', 'alice@example.com', self.password)
+        with self.assertRaises(ConnectionDoesNotExist):
+            self.assertDashboardLoads(AccessToken.for_user(user))
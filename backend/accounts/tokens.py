@@ -0,0 +1,30 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .revocation import revocation_store
+
+
+class RevocableTokenMixin:
+    """
+    Rejects tokens whose jti has been revoked, and makes `blacklist()` (what
+    simple JWT calls on logout and after rotation) revoke the token.
+    """
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if revocation_store.is_revoked(self[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token has been revoked'))
+
+    def blacklist(self):
+        revocation_store.revoke(self[api_settings.JTI_CLAIM], datetime_from_epoch(self['exp']))
+
+
+class AccessToken(RevocableTokenMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(RevocableTokenMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
@@ -2,11 +2,13 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from rest_framework_simplejwt import views as jwt_views
+from project.db.replicas import mark_writer, token_user_id
 from .serializers import UserRegistrationSerializer, UserProfileSerializer, UserSerializer
 from .models import UserProfile
+from .tokens import RefreshToken
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -17,6 +19,9 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
+        # The client's next request authenticates as the new user, whose row
+        # a replica may not have yet.
+        mark_writer(request, user.id)
         
         refresh = RefreshToken.for_user(user)
         
@@ -29,40 +34,54 @@ class RegisterView(generics.CreateAPIView):
             }
         }, status=status.HTTP_201_CREATED)
 
+def login_payload(user):
+    refresh = RefreshToken.for_user(user)
+    return {
+        'message': 'Login successful',
+        'user': UserSerializer(user).data,
+        'tokens': {
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        }
+    }
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login_view(request):
-    username = request.data.get('username')
-    email = request.data.get('email')
-    password = request.data.get('password')
-    
-    # Allow login with either username or email
-    if email and not username:
-        try:
-            user_obj = User.objects.get(email=email)
-            username = user_obj.username
-        except User.DoesNotExist:
-            return Response({
-                'error': 'Invalid credentials'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-    
-    user = authenticate(username=username, password=password)
+    # Username or email; EmailOrUsernameBackend resolves either in one query.
+    user = authenticate(
+        request,
+        username=request.data.get('username'),
+        email=request.data.get('email'),
+        password=request.data.get('password'),
+    )
     
     if user:
-        refresh = RefreshToken.for_user(user)
-        return Response({
-            'message': 'Login successful',
-            'user': UserSerializer(user).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
-        })
+        mark_writer(request, user.id)
+        return Response(login_payload(user))
     else:
         return Response({
             'error': 'Invalid credentials'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
+class MarkTokenUserMixin:
+    """
+    For simple JWT's token views: the user the tokens were issued to reads
+    from the primary for a while, like after a login.
+    """
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            mark_writer(request, token_user_id(response.data['access']))
+        return response
+
+class TokenObtainPairView(MarkTokenUserMixin, jwt_views.TokenObtainPairView):
+    pass
+
+class TokenRefreshView(MarkTokenUserMixin, jwt_views.TokenRefreshView):
+    pass
+
 class ProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
@@ -78,6 +97,9 @@ def logout_view(request):
         refresh_token = request.data.get("refresh_token")
         token = RefreshToken(refresh_token)
         token.blacklist()
+        # Revoke the access token used for this request too.
+        if request.auth is not None:
+            request.auth.blacklist()
         return Response({"message": "Successfully logged out"}, status=status.HTTP_205_RESET_CONTENT)
     except Exception as e:
         return Response({"error": "Invalid token"}, status=status.HTTP_400_BAD_REQUEST)
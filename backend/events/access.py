@@ -0,0 +1,58 @@
+from .models import RSVP
+
+# Private-event access for the current request. The caller's RSVP status is
+# looked up at most once per event and shared by the permission classes,
+# the views and the serializers. Whatever loaded it first (the conditional
+# GET validators, a list serializer, the async views) can seed it.
+
+
+class EventAccess:
+    """
+    The caller's RSVP status per event id, loaded on demand and memoized.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.rsvps = {}
+
+    def prime(self, event_id, status):
+        self.rsvps[event_id] = status
+
+    def user_rsvp(self, event_id):
+        if not self.user.is_authenticated:
+            return None
+        if event_id not in self.rsvps:
+            self.rsvps[event_id] = (
+                RSVP.objects.filter(event_id=event_id, user_id=self.user.id)
+                .values_list('status', flat=True).first()
+            )
+        return self.rsvps[event_id]
+
+    def load_rsvps(self, event_ids):
+        if not self.user.is_authenticated:
+            return
+        missing = [event_id for event_id in event_ids if event_id not in self.rsvps]
+        if missing:
+            self.rsvps.update(dict.fromkeys(missing))
+            self.rsvps.update(
+                RSVP.objects.filter(user_id=self.user.id, event_id__in=missing).values_list('event_id', 'status')
+            )
+
+    def can_view(self, event_id, is_public, organizer_id):
+        if is_public:
+            return True
+        if not self.user.is_authenticated:
+            return False
+        if organizer_id == self.user.id:
+            return True
+        return self.user_rsvp(event_id) is not None
+
+
+def event_access(request):
+    # DRF wraps the HttpRequest; keep the memo on the underlying one so
+    # code holding either object sees the same state.
+    http_request = getattr(request, '_request', request)
+    access = http_request.__dict__.get('_event_access')
+    if access is None:
+        access = http_request._event_access = EventAccess(request.user)
+    return access
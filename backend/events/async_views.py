@@ -0,0 +1,175 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound, PermissionDenied
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
+
+from .access import event_access
+from .cache import DASHBOARD_CACHE_TIMEOUT, dashboard_cache_key, dashboard_rebuild_reads
+from .conditional import check_conditions, event_detail_etag, event_reviews_etag, set_validators
+from .models import Event, RSVP, Review
+from .serializers import EMBEDDED_LIMIT, EventSerializer, EventDetailSerializer, ReviewSerializer
+from .views import (EventDetailView, EventListCreateView, EventReviewListCreateView, dashboard_page_ids,
+                    dashboard_params, dashboard_snapshot)
+
+# Async versions of the read-heavy endpoints for deployments served through
+# project/asgi.py. They reuse the DRF views for request parsing, filtering,
+# pagination and serialization, load everything with the async ORM, and make
+# sure serializers never need to hit the database themselves.
+
+
+def async_api_view(view_func):
+    @wraps(view_func)
+    async def wrapped(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return _json({'detail': f'Method "{request.method}" not allowed.'}, status.HTTP_405_METHOD_NOT_ALLOWED)
+        try:
+            return await view_func(request, *args, **kwargs)
+        except APIException as exc:
+            return _json({'detail': exc.detail}, exc.status_code)
+    return wrapped
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status_code)
+
+
+async def _initialize(view_class, request, **kwargs):
+    """
+    Build a DRF view instance around the request and authenticate the caller
+    (authentication backends are synchronous).
+    """
+    view = view_class(args=(), kwargs=kwargs, format_kwarg=None)
+    view.request = view.initialize_request(request, **kwargs)
+    await sync_to_async(view.perform_authentication)(view.request)
+    return view, view.request
+
+
+async def _load(*queries):
+    """
+    Run independent ORM callables one after another in a single
+    sync_to_async call. They share the sync thread's persistent (or pooled)
+    connection and, inside one transaction, read from the same snapshot.
+    """
+    def run():
+        with transaction.atomic(using=router.db_for_read(Event)):
+            return [query() for query in queries]
+    return await sync_to_async(run)()
+
+
+@async_api_view
+async def event_list(request):
+    view, drf_request = await _initialize(EventListCreateView, request)
+    user = drf_request.user
+
+    queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+    events = await view.paginator.apaginate_queryset(queryset, drf_request, view=view)
+
+    context = view.get_serializer_context()
+    if user.is_authenticated:
+        user_rsvps = dict.fromkeys(event.pk for event in events)
+        rows = RSVP.objects.filter(user_id=user.id, event_id__in=list(user_rsvps)).values_list('event_id', 'status')
+        async for event_id, status_value in rows:
+            user_rsvps[event_id] = status_value
+        context['user_rsvps'] = user_rsvps
+
+    data = EventSerializer(events, many=True, context=context).data
+    return _json(view.paginator.get_paginated_response(data).data)
+
+
+@async_api_view
+async def event_detail(request, pk):
+    view, drf_request = await _initialize(EventDetailView, request, pk=pk)
+    user = drf_request.user
+    not_modified, validators = await sync_to_async(check_conditions)(drf_request, event_detail_etag, pk=pk)
+    if not_modified is not None:
+        return not_modified
+
+    def load_event():
+        return Event.objects.select_related('organizer').filter(pk=pk).first()
+
+    def load_user_rsvp():
+        if not user.is_authenticated:
+            return None
+        return RSVP.objects.filter(event_id=pk, user_id=user.id).values_list('status', flat=True).first()
+
+    def load_reviews():
+        return list(Review.objects.filter(event_id=pk).select_related('user__profile')
+                    .order_by('-created_at')[:EMBEDDED_LIMIT])
+
+    def load_rsvps():
+        return list(RSVP.objects.filter(event_id=pk).select_related('user').order_by('-created_at')[:EMBEDDED_LIMIT])
+
+    event, user_rsvp, reviews, rsvps = await _load(load_event, load_user_rsvp, load_reviews, load_rsvps)
+    if event is None:
+        raise NotFound()
+
+    access = event_access(drf_request)
+    access.prime(event.pk, user_rsvp)
+    if not access.can_view(event.pk, event.is_public, event.organizer_id):
+        if not user.is_authenticated:
+            raise NotAuthenticated()
+        raise PermissionDenied()
+
+    for rsvp in rsvps:
+        rsvp.event = event
+    event.recent_reviews = reviews
+    event.recent_rsvps = rsvps
+
+    return set_validators(_json(EventDetailSerializer(event, context=view.get_serializer_context()).data), validators)
+
+
+@async_api_view
+async def event_reviews(request, event_id):
+    view, drf_request = await _initialize(EventReviewListCreateView, request, event_id=event_id)
+    not_modified, validators = await sync_to_async(check_conditions)(
+        drf_request, event_reviews_etag, event_id=event_id,
+    )
+    if not_modified is not None:
+        return not_modified
+    reviews = await view.paginator.apaginate_queryset(view.get_queryset(), drf_request, view=view)
+    data = ReviewSerializer(reviews, many=True, context=view.get_serializer_context()).data
+    return set_validators(_json(view.paginator.get_paginated_response(data).data), validators)
+
+
+@async_api_view
+async def user_dashboard(request):
+    view, drf_request = await _initialize(APIView, request)
+    user = drf_request.user
+    if not user.is_authenticated:
+        raise NotAuthenticated()
+
+    params = dashboard_params(drf_request)
+    if params is None:
+        return _json({'error': 'Invalid page parameters'}, status.HTTP_400_BAD_REQUEST)
+    page, page_size = params
+
+    cache_key = await sync_to_async(dashboard_cache_key)(user.id, page, page_size)
+    snapshot = await sync_to_async(cache.get)(cache_key)
+    if snapshot is not None:
+        return _json(snapshot)
+
+    def load_rsvps():
+        return list(RSVP.objects.filter(user_id=user.id).order_by('-created_at').values_list('event_id', 'status'))
+
+    def load_organized_ids():
+        return list(Event.objects.filter(organizer_id=user.id).order_by('-created_at').values_list('id', flat=True))
+
+    with await sync_to_async(dashboard_rebuild_reads)(user.id):
+        rsvp_rows, organized_ids = await _load(load_rsvps, load_organized_ids)
+
+        rsvp_map = dict.fromkeys(organized_ids)
+        rsvp_map.update(rsvp_rows)
+        rsvped_ids = [event_id for event_id, status_value in rsvp_rows if status_value in ['going', 'maybe']]
+
+        organized_page, rsvped_page = dashboard_page_ids(organized_ids, rsvped_ids, page, page_size)
+        events = await Event.objects.select_related('organizer').ain_bulk(organized_page + rsvped_page)
+
+    snapshot = dashboard_snapshot(drf_request, rsvp_map, organized_ids, rsvped_ids, events, page, page_size)
+    await sync_to_async(cache.set)(cache_key, snapshot, DASHBOARD_CACHE_TIMEOUT)
+    return _json(snapshot)
@@ -0,0 +1,117 @@
+import hashlib
+from contextlib import nullcontext
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from project.db import replicas
+
+# Dashboard snapshots are cached per user under a version token. Any write
+# that changes what a user sees replaces their token, which orphans every
+# cached page for that user at once. Changes that only move counters on
+# other people's events are picked up when the snapshot expires.
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+EVENTS_FEED_CACHE_TIMEOUT = getattr(settings, 'EVENTS_FEED_CACHE_TIMEOUT', 30)
+EVENTS_FEED_STALE_TIMEOUT = getattr(settings, 'EVENTS_FEED_STALE_TIMEOUT', 600)
+EVENTS_FEED_LOCK_TIMEOUT = 30
+
+EVENTS_VERSION_KEY = 'events:version'
+
+# A replica can lag behind the write that replaced a version. For
+# REPLICA_STICKY_SECONDS after a bump, cache misses are rebuilt from the
+# primary, so a stale replica read is never cached under the new version.
+EVENTS_FRESH_KEY = 'events:fresh'
+
+
+def _version_key(user_id):
+    return f'dashboard:version:{user_id}'
+
+
+def _fresh_key(user_id):
+    return f'dashboard:fresh:{user_id}'
+
+
+def dashboard_cache_key(user_id, *parts):
+    version_key = _version_key(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid4().hex
+        cache.add(version_key, version, None)
+        version = cache.get(version_key, version)
+    return ':'.join(['dashboard', str(user_id), version, *map(str, parts)])
+
+
+def invalidate_dashboards(user_ids):
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        cache.set_many({_version_key(user_id): uuid4().hex for user_id in user_ids}, None)
+        if replicas.REPLICAS:
+            cache.set_many(dict.fromkeys(map(_fresh_key, user_ids), 1), replicas.STICKY_SECONDS)
+
+
+def rebuild_reads(fresh_key):
+    """
+    Where to read from when rebuilding a cache entry: the primary while the
+    version behind it was replaced recently, wherever the request allows
+    otherwise.
+    """
+    if replicas.REPLICAS and cache.get(fresh_key) is not None:
+        return replicas.primary_reads()
+    return nullcontext()
+
+
+def dashboard_rebuild_reads(user_id):
+    return rebuild_reads(_fresh_key(user_id))
+
+
+# The anonymous events feed is cached per query string under a global
+# events version, which any Event, RSVP or Review write replaces. The last
+# rendered copy of each query is also kept as a stale fallback: when the
+# current entry is missing, one worker takes a short lock and rebuilds it
+# while every other worker keeps serving the stale copy.
+
+def events_version():
+    version = cache.get(EVENTS_VERSION_KEY)
+    if version is None:
+        cache.add(EVENTS_VERSION_KEY, uuid4().hex, None)
+        version = cache.get(EVENTS_VERSION_KEY, '')
+    return version
+
+
+def bump_events_version():
+    cache.set(EVENTS_VERSION_KEY, uuid4().hex, None)
+    if replicas.REPLICAS:
+        cache.set(EVENTS_FRESH_KEY, 1, replicas.STICKY_SECONDS)
+
+
+def _feed_digest(request):
+    query = request.get_host() + '?' + urlencode(sorted(request.GET.lists()), doseq=True)
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def cached_events_feed(request, build):
+    digest = _feed_digest(request)
+    key = f'events:feed:{events_version()}:{digest}'
+    stale_key = f'events:feed:stale:{digest}'
+    lock_key = f'events:feed:lock:{digest}'
+
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    stale = cache.get(stale_key)
+    locked = cache.add(lock_key, 1, EVENTS_FEED_LOCK_TIMEOUT)
+    if stale is not None and not locked:
+        return stale
+
+    try:
+        with rebuild_reads(EVENTS_FRESH_KEY):
+            data = build()
+        cache.set(key, data, EVENTS_FEED_CACHE_TIMEOUT)
+        cache.set(stale_key, data, EVENTS_FEED_STALE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return data
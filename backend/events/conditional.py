@@ -0,0 +1,114 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from .access import event_access
+from .models import Event, RSVP
+
+# Validators for conditional GETs on an event and its reviews. They are
+# built from a single indexed lookup of the event row (counters, rating
+# summary and activity timestamp) plus the caller's own RSVP, so a matching
+# If-None-Match / If-Modified-Since is answered without serializing anything.
+# The RSVP is handed to the request's EventAccess, so the same lookup also
+# authorizes the rest of the request.
+
+VALIDATOR_FIELDS = [
+    'id', 'is_public', 'organizer_id', 'activity_at', 'going_count', 'maybe_count',
+    'not_going_count', 'review_count', 'rating_sum',
+]
+
+
+def _event_state(request, event_id):
+    cache = request.__dict__.setdefault('_event_validators', {})
+    if event_id not in cache:
+        user = request.user
+        access = event_access(request)
+        queryset = Event.objects.filter(pk=event_id)
+        if user.is_authenticated:
+            user_rsvp = RSVP.objects.filter(event_id=OuterRef('pk'), user_id=user.id).values('status')[:1]
+            queryset = queryset.annotate(user_rsvp=Subquery(user_rsvp))
+            state = queryset.values(*VALIDATOR_FIELDS, 'user_rsvp').first()
+            if state is not None:
+                access.prime(state['id'], state['user_rsvp'])
+        else:
+            state = queryset.values(*VALIDATOR_FIELDS).first()
+        if state is not None and not access.can_view(state['id'], state['is_public'], state['organizer_id']):
+            state = None
+        cache[event_id] = state
+    return cache[event_id]
+
+
+def _etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def event_detail_etag(request, pk, **kwargs):
+    state = _event_state(request, pk)
+    if state is None:
+        return None
+    return _etag('event', request.user.id, *state.values())
+
+
+def event_reviews_etag(request, event_id, **kwargs):
+    state = _event_state(request, event_id)
+    if state is None:
+        return None
+    return _etag('reviews', request.user.id, request.GET.urlencode(), *state.values())
+
+
+def event_last_modified(request, pk=None, event_id=None, **kwargs):
+    state = _event_state(request, pk if pk is not None else event_id)
+    if state is None:
+        return None
+    return state['activity_at']
+
+
+def conditional_get(etag_func):
+    """
+    Decorate a class-based view's `get` with ETag / Last-Modified handling.
+    The validators depend on the caller, so responses vary on Authorization.
+    """
+    check_conditions = method_decorator(condition(etag_func=etag_func, last_modified_func=event_last_modified))
+
+    def decorator(get):
+        get = check_conditions(get)
+
+        @wraps(get)
+        def wrapped(self, request, *args, **kwargs):
+            response = get(self, request, *args, **kwargs)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapped
+    return decorator
+
+
+def check_conditions(request, etag_func, **kwargs):
+    """
+    The `condition` decorator's checks for views that cannot use it (the
+    async views). Returns a 304 / 412 response or None, and the validators
+    to put on the full response with `set_validators`.
+    """
+    etag = etag_func(request, **kwargs)
+    etag = quote_etag(etag) if etag else None
+    last_modified = event_last_modified(request, **kwargs)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    validators = (etag, last_modified)
+    if response is not None:
+        set_validators(response, validators)
+    return response, validators
+
+
+def set_validators(response, validators):
+    etag, last_modified = validators
+    if last_modified and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(last_modified)
+    if etag:
+        response.headers.setdefault('ETag', etag)
+    patch_vary_headers(response, ['Authorization'])
+    return response
@@ -0,0 +1,134 @@
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.negotiation import BaseContentNegotiation
+
+from .models import RSVP, Review
+
+# Organizer exports of an event's RSVPs and reviews. Rows are read with a
+# chunked server-side iterator over a values() projection and written out
+# as they arrive, so memory use does not depend on the size of the event
+# and the header goes out before the query has run.
+
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+# Spreadsheet programs evaluate cells starting with these as formulas.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# The orderings follow the (event, status) and (event, created_at, id)
+# indexes, so rows stream without a sort step.
+EXPORTS = {
+    'rsvps': (
+        lambda event_id: RSVP.objects.filter(event_id=event_id).order_by('status', 'id'),
+        {
+            'id': 'id',
+            'username': 'user__username',
+            'full_name': 'user__profile__full_name',
+            'status': 'status',
+            'created_at': 'created_at',
+            'updated_at': 'updated_at',
+        },
+    ),
+    'reviews': (
+        lambda event_id: Review.objects.filter(event_id=event_id).order_by('created_at', 'id'),
+        {
+            'id': 'id',
+            'username': 'user__username',
+            'rating': 'rating',
+            'comment': 'comment',
+            'created_at': 'created_at',
+            'updated_at': 'updated_at',
+        },
+    ),
+}
+
+
+class ExportContentNegotiation(BaseContentNegotiation):
+    """
+    The export views answer in the format named in the URL, so they accept
+    any Accept header; errors are rendered with the first renderer.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class Echo:
+    """
+    A file-like object whose write() returns the line instead of storing it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_chunks(kind, event_id, fmt):
+    """
+    The export as text chunks of up to EXPORT_CHUNK_SIZE rows each. A CSV
+    header is sent on its own, before the query runs.
+    """
+    queryset, fields = EXPORTS[kind]
+    columns = list(fields)
+    if fmt == 'csv':
+        yield csv.writer(Echo()).writerow(columns)
+    rows = queryset(event_id).values_list(*fields.values()).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    lines = csv_lines(rows) if fmt == 'csv' else ndjson_lines(columns, rows)
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+async def _aiterate(chunks):
+    # Under ASGI a synchronous iterator would be read into memory in full
+    # before sending; pull it one chunk at a time on the sync thread instead.
+    next_chunk = sync_to_async(next)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def export_response(request, kind, event_id, fmt):
+    chunks = export_chunks(kind, event_id, fmt)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _aiterate(chunks)
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="event-{event_id}-{kind}.{fmt}"'
+    return response
@@ -0,0 +1,80 @@
+from django.db.models import Q
+from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+
+from . import geo
+from .models import Event, EventDay, event_days
+
+
+class IsoDateTimeRangeFilter(filters.BaseRangeFilter, filters.IsoDateTimeFilter):
+    """
+    Two ISO 8601 datetimes separated by a comma.
+    """
+
+
+class CoordinatesFilter(filters.BaseCSVFilter, filters.NumberFilter):
+    """
+    A latitude and a longitude separated by a comma.
+    """
+
+
+class EventFilter(filters.FilterSet):
+    """
+    `start_after` / `start_before` bound the start time (inclusive /
+    exclusive). `overlaps=<from>,<to>` keeps events running at any moment in
+    that window; the candidates come from the event_days table, so only the
+    days in the window are read. `near=<lat>,<lng>&radius=<km>` keeps
+    geotagged events within the radius (default 10 km) of the point.
+    """
+    start_after = filters.IsoDateTimeFilter(field_name='start_time', lookup_expr='gte')
+    start_before = filters.IsoDateTimeFilter(field_name='start_time', lookup_expr='lt')
+    overlaps = IsoDateTimeRangeFilter(method='filter_overlaps')
+    near = CoordinatesFilter(method='filter_near')
+    radius = filters.NumberFilter(method='filter_radius')
+
+    class Meta:
+        model = Event
+        fields = ['is_public', 'organizer']
+
+    def filter_overlaps(self, queryset, name, value):
+        start, end = value
+        if start >= end:
+            return queryset.none()
+        first, last = event_days(start, start)[0], event_days(end, end)[0]
+        touching = EventDay.objects.filter(day__range=(first, last)).values('event_id')
+        return queryset.filter(pk__in=touching, start_time__lt=end, end_time__gt=start)
+
+    def filter_radius(self, queryset, name, value):
+        # Applied by filter_near.
+        return queryset
+
+    def filter_near(self, queryset, name, value):
+        if len(value) != 2:
+            raise ValidationError({'near': 'Expected a latitude and a longitude separated by a comma.'})
+        latitude, longitude = map(float, value)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValidationError({'near': 'Latitude must be within ±90 and longitude within ±180.'})
+        radius = self.form.cleaned_data.get('radius')
+        radius = geo.DEFAULT_RADIUS_KM if radius is None else float(radius)
+        if not 0 < radius <= geo.MAX_RADIUS_KM:
+            raise ValidationError({'radius': f'Radius must be above 0 and at most {geo.MAX_RADIUS_KM} km.'})
+
+        # Candidates: the geohash cells around the point, narrowed to the
+        # bounding box. Then the exact distance decides, in the same
+        # subquery.
+        min_lat, max_lat, min_lng, max_lng = geo.bounding_box(latitude, longitude, radius)
+        candidates = Event.objects.filter(geohash__isnull=False, latitude__range=(min_lat, max_lat))
+        if min_lng is not None:
+            candidates = candidates.filter(longitude__range=(min_lng, max_lng))
+        cells = geo.covering_cells(latitude, longitude, radius)
+        if cells is not None:
+            in_cells = Q()
+            for cell in cells:
+                in_cells |= Q(geohash__gte=cell, geohash__lt=cell + geo.PREFIX_END)
+            candidates = candidates.filter(in_cells)
+        within = (
+            candidates.order_by()
+            .alias(haversine=geo.haversine_term(latitude, longitude))
+            .filter(haversine__lte=geo.radius_limit(radius))
+        )
+        return queryset.filter(pk__in=within.values('id'))
@@ -0,0 +1,116 @@
+import math
+
+from django.db.models import F, Value
+from django.db.models.functions import Cos, Radians, Sin
+
+# Geohash cells for "events near a point". Every geotagged event stores the
+# geohash of its coordinates, and an indexed range scan over a handful of
+# geohash prefixes finds the candidates around a point. The candidates are
+# then checked against the exact great-circle distance in the same query,
+# with plain trigonometric functions (Django provides them on SQLite), so
+# none of this needs a spatial extension in the database.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Sorts after every geohash character: [prefix, prefix + PREFIX_END) holds
+# exactly the hashes starting with prefix.
+PREFIX_END = '{'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 500
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = bit_count = 0
+    even = True
+    while len(chars) < precision:
+        interval, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            interval[0] = mid
+        else:
+            bits *= 2
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """
+    Height and width in degrees of a geohash cell of the given length.
+    """
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    (min_lat, max_lat, min_lng, max_lng) around the circle. The longitude
+    bounds are None when the circle reaches a pole or crosses the
+    antimeridian.
+    """
+    lat_margin = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - lat_margin, latitude + lat_margin
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+    lng_margin = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(widest))))
+    if longitude - lng_margin < -180 or longitude + lng_margin > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, longitude - lng_margin, longitude + lng_margin
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """
+    Geohash prefixes whose cells cover the circle: the cell holding the
+    point and its neighbours, at the finest precision whose cells are at
+    least as large as the circle's bounding box. None when the circle is too
+    large for any precision.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    if min_lng is None:
+        return None
+    lat_margin, lng_margin = max_lat - latitude, max_lng - longitude
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if height >= lat_margin and width >= lng_margin:
+            break
+    else:
+        return None
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        cell_lat = latitude + lat_step * height
+        if abs(cell_lat) > 90:
+            continue
+        for lng_step in (-1, 0, 1):
+            cell_lng = (longitude + lng_step * width + 180) % 360 - 180
+            cells.add(encode(cell_lat, cell_lng, precision))
+    return sorted(cells)
+
+
+def haversine_term(latitude, longitude):
+    """
+    An expression for the haversine term between an event's coordinates and
+    the point. Comparing it with radius_limit() decides whether the event is
+    within the radius without any inverse trigonometry.
+    """
+    lat0 = math.radians(latitude)
+    lng0 = math.radians(longitude)
+    half_dlat = Sin((Radians(F('latitude')) - Value(lat0)) * Value(0.5))
+    half_dlng = Sin((Radians(F('longitude')) - Value(lng0)) * Value(0.5))
+    return half_dlat * half_dlat + Value(math.cos(lat0)) * Cos(Radians(F('latitude'))) * half_dlng * half_dlng
+
+
+def radius_limit(radius_km):
+    """
+    The haversine term at the given distance.
+    """
+    return math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2) ** 2
@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from events import importer
+from events.cache import bump_events_version, invalidate_dashboards
+
+# Files at least this large are validated in a process pool by default.
+LARGE_FILE_BYTES = 16 * 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Import events from a CSV or NDJSON file (or - for stdin). Rows are validated like POST /api/events/; '
+        'the organizer column holds a username. Rejected rows are written to an NDJSON error file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' to read standard input.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Input format; guessed from the extension by default.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per validation batch and insert transaction.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help=f'Validation processes; 0 validates inline. Defaults to one per CPU for files of '
+                 f'{LARGE_FILE_BYTES // (1024 * 1024)} MB or more, inline otherwise.',
+        )
+        parser.add_argument('--errors', help='Where to write rejected rows; defaults to <path>.rejected.ndjson.')
+        parser.add_argument('--database', default='default', help='Database alias to import into.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or importer.FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise CommandError('Cannot tell the input format from the file name; pass --format.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        errors_path = options['errors'] or ('import_events.rejected.ndjson' if path == '-' else f'{path}.rejected.ndjson')
+        workers = options['workers']
+        try:
+            if workers is None:
+                large = path != '-' and os.path.getsize(path) >= LARGE_FILE_BYTES
+                workers = (os.cpu_count() or 1) if large else 0
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+        errors_file = None
+        organizer_ids = {}
+        imported_organizers = set()
+        imported = rejected = 0
+        started = time.monotonic()
+        try:
+            batches = importer.batched(importer.read_rows(stream, fmt), options['batch_size'])
+            for accepted, rejections in importer.validated_batches(batches, workers):
+                importer.resolve_organizers(
+                    [str(row['organizer']) for _, row, _ in accepted], organizer_ids, using=options['database'],
+                )
+                unknown = [item for item in accepted if organizer_ids[str(item[1]['organizer'])] is None]
+                if unknown:
+                    accepted = [item for item in accepted if organizer_ids[str(item[1]['organizer'])] is not None]
+                    rejections.extend(
+                        (line_number, row, {'organizer': [f"Unknown user '{row['organizer']}'"]})
+                        for line_number, row, _ in unknown
+                    )
+
+                events = importer.insert_batch(accepted, organizer_ids, using=options['database'])
+                imported += len(events)
+                imported_organizers.update(event.organizer_id for event in events)
+
+                if rejections:
+                    if errors_file is None:
+                        errors_file = open(errors_path, 'w', encoding='utf-8')
+                    for line_number, row, errors in sorted(rejections, key=lambda rejection: rejection[0]):
+                        errors_file.write(json.dumps({'line': line_number, 'row': row, 'errors': errors}) + '\n')
+                    rejected += len(rejections)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{imported} imported, {rejected} rejected ({imported / elapsed:.0f} events/s)")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if errors_file is not None:
+                errors_file.close()
+            # bulk_create sends no signals, so invalidate cached feeds and
+            # dashboards here. New events have no RSVPs or reviews, so their
+            # counters need no rebuild.
+            if imported:
+                bump_events_version()
+                invalidate_dashboards(imported_organizers)
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} event(s) in {time.monotonic() - started:.1f}s"))
+        if rejected:
+            self.stdout.write(self.style.WARNING(f"Rejected {rejected} row(s); see {errors_path}"))
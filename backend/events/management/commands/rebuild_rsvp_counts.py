@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from events.models import Event, RSVP
+
+# Drifted events are repaired this many at a time, one transaction each.
+REPAIR_BATCH_SIZE = 500
+
+
+def recounted(status):
+    """
+    The number of RSVPs with this status on the event being updated.
+    """
+    total = (
+        RSVP.objects.filter(event_id=OuterRef('pk'), status=status).order_by()
+        .values('event_id').annotate(total=Count('id')).values('total')
+    )
+    return Coalesce(Subquery(total), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored RSVP tallies on every event and report any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report events whose stored tallies are wrong; exit non-zero if any are found.',
+        )
+
+    def handle(self, *args, **options):
+        fields = list(Event.COUNTER_FIELDS.values())
+        actual = {}
+        rows = RSVP.objects.order_by().values_list('event_id', 'status').annotate(total=Count('id'))
+        for event_id, status, total in rows:
+            if status in Event.COUNTER_FIELDS:
+                actual.setdefault(event_id, {})[Event.COUNTER_FIELDS[status]] = total
+
+        drifted = {}
+        stored = Event.objects.order_by().values_list('id', *fields)
+        for event_id, *values in stored.iterator(chunk_size=2000):
+            expected = {field: actual.get(event_id, {}).get(field, 0) for field in fields}
+            if dict(zip(fields, values)) != expected:
+                drifted[event_id] = expected
+
+        for event_id, expected in drifted.items():
+            self.stdout.write(f"Event {event_id}: expected {expected}")
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f"{len(drifted)} event(s) have stale RSVP counts")
+            self.stdout.write(self.style.SUCCESS('All RSVP counts are consistent'))
+            return
+
+        # The tallies above may be out of date by now: RSVPs written since
+        # then have already adjusted the stored counts. Lock the events and
+        # count again inside the UPDATE, so those changes are not lost.
+        counts = {field: recounted(status) for status, field in Event.COUNTER_FIELDS.items()}
+        event_ids = list(drifted)
+        for start in range(0, len(event_ids), REPAIR_BATCH_SIZE):
+            batch = event_ids[start:start + REPAIR_BATCH_SIZE]
+            with transaction.atomic():
+                list(Event.objects.select_for_update().filter(pk__in=batch).values_list('pk', flat=True))
+                Event.objects.filter(pk__in=batch).update(**counts)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt RSVP counts for {len(drifted)} event(s)"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from events import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        with transaction.atomic(using=options['database']):
+            search.drop_index(connection)
+            search.create_index(connection)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search index on '{options['database']}'"))
@@ -0,0 +1,40 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database over every replica file, to try read-replica routing locally. '
+        'With --interval it keeps copying, so the replicas lag behind the primary by up to that many seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Seconds between copies; 0 copies once.')
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        if primary['ENGINE'] not in ('django.db.backends.sqlite3', 'project.db.sqlite3'):
+            raise CommandError('sync_replicas only works with SQLite; real replicas are kept in sync by the database.')
+        replicas = [connections[alias].settings_dict['NAME'] for alias in settings.DATABASE_REPLICAS]
+        if not replicas:
+            raise CommandError('No replicas configured; set DB_REPLICA_PATHS.')
+
+        while True:
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for path in replicas:
+                    target = sqlite3.connect(path)
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(self.style.SUCCESS(f"Copied primary to {len(replicas)} replica(s)"))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
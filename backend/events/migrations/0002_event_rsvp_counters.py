@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:34
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rsvp_counts(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    RSVP = apps.get_model('events', 'RSVP')
+    fields = {'going': 'going_count', 'maybe': 'maybe_count', 'not_going': 'not_going_count'}
+    tallies = {}
+    rows = RSVP.objects.order_by().values_list('event_id', 'status').annotate(total=Count('id'))
+    for event_id, status, total in rows:
+        if status in fields:
+            tallies.setdefault(event_id, {})[fields[status]] = total
+    for event_id, counts in tallies.items():
+        Event.objects.filter(pk=event_id).update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='going_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='maybe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='not_going_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rsvp_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:52
+
+from django.db import migrations
+
+# The SQL is copied from events/search.py as it stood when this migration
+# was written, so later changes to that module cannot alter its history.
+
+CREATE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS event_search USING fts5("
+        "title, description, location, organizer, tokenize='unicode61 remove_diacritics 2')",
+        "INSERT INTO event_search (rowid, title, description, location, organizer) "
+        "SELECT e.id, e.title, e.description, e.location, u.username "
+        "FROM events e JOIN auth_user u ON u.id = e.organizer_id",
+    ],
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS event_search ("
+        "event_id bigint PRIMARY KEY REFERENCES events (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "document tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS event_search_document_gin ON event_search USING GIN (document)",
+        "INSERT INTO event_search (event_id, document) "
+        "SELECT e.id, "
+        "setweight(to_tsvector('english', coalesce(e.title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(e.location, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(u.username, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(e.description, '')), 'C') "
+        "FROM events e JOIN auth_user u ON u.id = e.organizer_id "
+        "ON CONFLICT (event_id) DO UPDATE SET document = EXCLUDED.document",
+    ],
+}
+DROP = {
+    'sqlite': ["DROP TABLE IF EXISTS event_search"],
+    'postgresql': ["DROP TABLE IF EXISTS event_search"],
+}
+
+
+def run_statements(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    run_statements(schema_editor, CREATE)
+
+
+def drop_search_index(apps, schema_editor):
+    run_statements(schema_editor, DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_rsvp_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:42
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_updated_at(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Event.objects.update(activity_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_event_rating_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='activity_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_updated_at, migrations.RunPython.noop),
+    ]
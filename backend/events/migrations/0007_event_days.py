@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import time, timedelta
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def event_days(start_time, end_time):
+    zone = timezone.get_default_timezone()
+    first = timezone.localtime(start_time, zone).date()
+    end = timezone.localtime(end_time, zone)
+    last = end.date()
+    if end.time() == time.min and last > first:
+        last -= timedelta(days=1)
+    return [first + timedelta(days=offset) for offset in range(max((last - first).days, 0) + 1)]
+
+
+def backfill_event_days(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventDay = apps.get_model('events', 'EventDay')
+    batch = []
+    for event_id, start_time, end_time in Event.objects.values_list('id', 'start_time', 'end_time').iterator():
+        batch.extend(EventDay(event_id=event_id, day=day) for day in event_days(start_time, end_time))
+        if len(batch) >= BATCH_SIZE:
+            EventDay.objects.bulk_create(batch)
+            batch = []
+    EventDay.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_api_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='events.event')),
+            ],
+            options={
+                'db_table': 'event_days',
+                'unique_together': {('day', 'event')},
+            },
+        ),
+        migrations.RunPython(backfill_event_days, migrations.RunPython.noop),
+    ]
@@ -1,30 +1,247 @@
 from django.db import models
+from django.db.models import Case, Count, Exists, F, FloatField, OuterRef, Q, QuerySet, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from datetime import time, timedelta
+from django.utils import timezone
+from . import geo, search
+from .cache import bump_events_version, invalidate_dashboards
+
+class EventQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Events the user may see: public ones, their own, and private events
+        they have RSVPed to. The RSVP branch is an EXISTS subquery so the
+        result needs no JOIN or DISTINCT.
+        """
+        if not user.is_authenticated:
+            return self.filter(is_public=True)
+        attending = RSVP.objects.filter(event_id=OuterRef('pk'), user_id=user.id)
+        return self.filter(Q(is_public=True) | Q(organizer_id=user.id) | Exists(attending))
+
 
 class Event(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='organized_events')
     location = models.CharField(max_length=255)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # Geohash of (latitude, longitude), derived on save; indexed for `near` queries.
+    geohash = models.CharField(max_length=geo.GEOHASH_PRECISION, null=True, blank=True, editable=False)
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     is_public = models.BooleanField(default=True)
+    going_count = models.PositiveIntegerField(default=0, editable=False)
+    maybe_count = models.PositiveIntegerField(default=0, editable=False)
+    not_going_count = models.PositiveIntegerField(default=0, editable=False)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    average_rating = models.FloatField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Moves whenever the event or any of its RSVPs or reviews change; used
+    # as the Last-Modified validator for conditional GETs.
+    activity_at = models.DateTimeField(auto_now=True, editable=False)
+
+    objects = EventQuerySet.as_manager()
+
+    COUNTER_FIELDS = {
+        'going': 'going_count',
+        'maybe': 'maybe_count',
+        'not_going': 'not_going_count',
+    }
+    RATING_FIELDS = {rating: f'rating_{rating}_count' for rating in range(1, 6)}
+    SUMMARY_FIELDS = ['review_count', 'rating_sum', 'average_rating', *RATING_FIELDS.values()]
+    DENORMALIZED_FIELDS = [*COUNTER_FIELDS.values(), *SUMMARY_FIELDS]
+    # The stored fields that attendees' dashboards show; saves that change
+    # none of them leave those dashboards cached.
+    DASHBOARD_FIELDS = [
+        'title', 'description', 'organizer', 'location', 'latitude', 'longitude', 'start_time', 'end_time',
+        'is_public',
+    ]
 
     class Meta:
         ordering = ['-created_at']
         db_table = 'events'
+        # Ascending indexes ending in id serve the keyset orderings such as
+        # (-created_at, -id) by scanning backwards, with no sort step.
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='events_created_idx'),
+            models.Index(fields=['created_at', 'id'], condition=Q(is_public=True), name='events_public_created_idx'),
+            models.Index(fields=['organizer', 'created_at'], name='events_organizer_created_idx'),
+            models.Index(fields=['start_time', 'id'], name='events_start_time_idx'),
+            models.Index(fields=['average_rating', 'id'], name='events_rating_idx'),
+            models.Index(fields=['review_count', 'id'], name='events_review_count_idx'),
+            models.Index(fields=['geohash'], condition=Q(geohash__isnull=False), name='events_geohash_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._shown_values = self.dashboard_values() if self.pk else None
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        # Dashboards were built from the stored row.
+        self._shown_values = self.dashboard_values()
+
+    def dashboard_values(self):
+        """
+        The loaded values of DASHBOARD_FIELDS; deferred fields are left out.
+        """
+        attnames = [self._meta.get_field(name).attname for name in self.DASHBOARD_FIELDS]
+        return {attname: self.__dict__[attname] for attname in attnames if attname in self.__dict__}
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # The RSVP tallies and rating summary are only ever written by atomic
+        # UPDATEs, so a plain save of a loaded event must not overwrite them
+        # with stale values.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'latitude', 'longitude'}.intersection(update_fields):
+            self.geohash = self.compute_geohash()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
+    def compute_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            return None
+        return geo.encode(self.latitude, self.longitude)
+
     @property
     def attendee_count(self):
-        return self.rsvps.filter(status='going').count()
+        return self.going_count
+
+    @classmethod
+    def adjust_rsvp_counts(cls, event_id, old_status=None, new_status=None):
+        """
+        Move one RSVP between the stored tallies with a single UPDATE, which
+        also marks the event as recently active.
+        """
+        changes = {'activity_at': timezone.now()}
+        if old_status == new_status:
+            cls.objects.filter(pk=event_id).update(**changes)
+            return
+        if old_status in cls.COUNTER_FIELDS:
+            field = cls.COUNTER_FIELDS[old_status]
+            changes[field] = F(field) - 1
+        if new_status in cls.COUNTER_FIELDS:
+            field = cls.COUNTER_FIELDS[new_status]
+            changes[field] = F(field) + 1
+        cls.objects.filter(pk=event_id).update(**changes)
+
+    @classmethod
+    def apply_rsvp_moves(cls, moves):
+        """
+        Apply many (event_id, old_status, new_status) moves to the stored
+        tallies of their events in a single UPDATE.
+        """
+        deltas = {}
+        for event_id, old_status, new_status in moves:
+            if old_status == new_status:
+                continue
+            event_deltas = deltas.setdefault(event_id, dict.fromkeys(cls.COUNTER_FIELDS.values(), 0))
+            if old_status in cls.COUNTER_FIELDS:
+                event_deltas[cls.COUNTER_FIELDS[old_status]] -= 1
+            if new_status in cls.COUNTER_FIELDS:
+                event_deltas[cls.COUNTER_FIELDS[new_status]] += 1
+        if not deltas:
+            return
+        changes = {'activity_at': timezone.now()}
+        for field in cls.COUNTER_FIELDS.values():
+            whens = [
+                When(pk=event_id, then=Value(event_deltas[field]))
+                for event_id, event_deltas in deltas.items() if event_deltas[field]
+            ]
+            if whens:
+                changes[field] = F(field) + Case(*whens, default=Value(0))
+        cls.objects.filter(pk__in=list(deltas)).update(**changes)
+
+    def rsvp_tallies(self):
+        tallies = dict.fromkeys(self.COUNTER_FIELDS.values(), 0)
+        for status, total in self.rsvps.order_by().values_list('status').annotate(total=Count('id')):
+            if status in self.COUNTER_FIELDS:
+                tallies[self.COUNTER_FIELDS[status]] = total
+        return tallies
+
     def update_attendee_count(self):
-        pass
+        tallies = self.rsvp_tallies()
+        Event.objects.filter(pk=self.pk).update(**tallies)
+        for field, value in tallies.items():
+            setattr(self, field, value)
+
+    @property
+    def rating_summary(self):
+        return {
+            'count': self.review_count,
+            'sum': self.rating_sum,
+            'average': round(self.average_rating, 2),
+            'histogram': {str(rating): getattr(self, field) for rating, field in self.RATING_FIELDS.items()},
+        }
+
+    @classmethod
+    def adjust_rating_summary(cls, event_id, old_rating=None, new_rating=None):
+        """
+        Apply one review's create, rating change or delete to the stored
+        rating summary with a single UPDATE.
+        """
+        changes = {'activity_at': timezone.now()}
+        if old_rating == new_rating:
+            cls.objects.filter(pk=event_id).update(**changes)
+            return
+        count_delta = (new_rating is not None) - (old_rating is not None)
+        sum_delta = (new_rating or 0) - (old_rating or 0)
+        if old_rating in cls.RATING_FIELDS:
+            field = cls.RATING_FIELDS[old_rating]
+            changes[field] = F(field) - 1
+        if new_rating in cls.RATING_FIELDS:
+            field = cls.RATING_FIELDS[new_rating]
+            changes[field] = F(field) + 1
+        # Every expression in the UPDATE sees the old row, so the average is
+        # computed from the old totals plus this change.
+        new_count = F('review_count') + count_delta
+        new_sum = F('rating_sum') + sum_delta
+        changes['review_count'] = new_count
+        changes['rating_sum'] = new_sum
+        changes['average_rating'] = Coalesce(
+            Cast(new_sum, FloatField()) / NullIf(new_count, 0),
+            Value(0.0),
+            output_field=FloatField()
+        )
+        cls.objects.filter(pk=event_id).update(**changes)
+
+    def rating_tallies(self):
+        totals = self.reviews.order_by().aggregate(review_count=Count('id'), rating_sum=Sum('rating'))
+        tallies = dict.fromkeys(self.RATING_FIELDS.values(), 0)
+        for rating, total in self.reviews.order_by().values_list('rating').annotate(total=Count('id')):
+            if rating in self.RATING_FIELDS:
+                tallies[self.RATING_FIELDS[rating]] = total
+        tallies['review_count'] = totals['review_count']
+        tallies['rating_sum'] = totals['rating_sum'] or 0
+        tallies['average_rating'] = tallies['rating_sum'] / tallies['review_count'] if tallies['review_count'] else 0
+        return tallies
+
+    def update_rating_summary(self):
+        tallies = self.rating_tallies()
+        Event.objects.filter(pk=self.pk).update(**tallies)
+        for field, value in tallies.items():
+            setattr(self, field, value)
 
 class RSVP(models.Model):
     STATUS_CHOICES = [
@@ -42,6 +259,23 @@ class RSVP(models.Model):
     class Meta:
         unique_together = ['event', 'user']
         db_table = 'rsvps'
+        indexes = [
+            models.Index(fields=['event', 'status'], name='rsvps_event_status_idx'),
+            models.Index(fields=['user', 'status'], name='rsvps_user_status_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counted_status = self.__dict__.get('status') if self.pk else None
+        self._counted_event_id = self.__dict__.get('event_id') if self.pk else None
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        # The reloaded row is the one the tallies already count.
+        if fields is None or 'status' in fields:
+            self._counted_status = self.status
+        if fields is None or 'event' in fields or 'event_id' in fields:
+            self._counted_event_id = self.event_id
 
     def __str__(self):
         return f"{self.user.username} - {self.event.title} ({self.status})"
@@ -58,6 +292,157 @@ class Review(models.Model):
         unique_together = ['event', 'user']
         ordering = ['-created_at']
         db_table = 'reviews'
+        indexes = [
+            models.Index(fields=['event', 'created_at', 'id'], name='reviews_event_created_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counted_rating = self.__dict__.get('rating') if self.pk else None
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        # The reloaded rating is the one the summary already counts.
+        if fields is None or 'rating' in fields:
+            self._counted_rating = self.rating
 
     def __str__(self):
         return f"{self.user.username} - {self.event.title} ({self.rating}/5)"
+
+
+def event_days(start_time, end_time):
+    """
+    The calendar days, in the project time zone, that an event touches. An
+    event ending exactly at midnight does not touch the day that starts then.
+    """
+    zone = timezone.get_default_timezone()
+    first = timezone.localtime(start_time, zone).date()
+    end = timezone.localtime(end_time, zone)
+    last = end.date()
+    if end.time() == time.min and last > first:
+        last -= timedelta(days=1)
+    return [first + timedelta(days=offset) for offset in range(max((last - first).days, 0) + 1)]
+
+
+class EventDay(models.Model):
+    """
+    One row per calendar day an event touches, so calendar and overlap
+    queries read only the days they cover however large the table grows.
+    Kept in step with the event's start and end times by a signal.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='days')
+    day = models.DateField()
+
+    class Meta:
+        unique_together = ['day', 'event']
+        db_table = 'event_days'
+
+    def __str__(self):
+        return f"{self.event_id} on {self.day}"
+
+    @classmethod
+    def sync(cls, event, created=False):
+        wanted = set(event_days(event.start_time, event.end_time))
+        existing = set() if created else set(cls.objects.filter(event_id=event.pk).values_list('day', flat=True))
+        if existing - wanted:
+            cls.objects.filter(event_id=event.pk, day__in=existing - wanted).delete()
+        if wanted - existing:
+            cls.objects.bulk_create([cls(event_id=event.pk, day=day) for day in sorted(wanted - existing)])
+
+
+def _deleted_with_event(origin):
+    # Rows removed because their event is being deleted need no bookkeeping.
+    if isinstance(origin, Event):
+        return True
+    return isinstance(origin, QuerySet) and origin.model is Event
+
+@receiver(post_save, sender=RSVP)
+def count_saved_rsvp(sender, instance, created, **kwargs):
+    old_status = None if created else instance._counted_status
+    old_event_id = None if created else instance._counted_event_id
+    if old_event_id is not None and old_event_id != instance.event_id:
+        # Moved to another event: it leaves the old tally and joins the new one.
+        Event.adjust_rsvp_counts(old_event_id, old_status, None)
+        old_status = None
+    Event.adjust_rsvp_counts(instance.event_id, old_status, instance.status)
+    instance._counted_status = instance.status
+    instance._counted_event_id = instance.event_id
+
+@receiver(post_delete, sender=RSVP)
+def count_deleted_rsvp(sender, instance, origin=None, **kwargs):
+    if _deleted_with_event(origin):
+        return
+    Event.adjust_rsvp_counts(instance._counted_event_id or instance.event_id, instance._counted_status, None)
+
+
+@receiver(post_save, sender=Review)
+def summarize_saved_review(sender, instance, created, **kwargs):
+    old_rating = None if created else instance._counted_rating
+    Event.adjust_rating_summary(instance.event_id, old_rating, instance.rating)
+    instance._counted_rating = instance.rating
+
+@receiver(post_delete, sender=Review)
+def summarize_deleted_review(sender, instance, origin=None, **kwargs):
+    if _deleted_with_event(origin):
+        return
+    Event.adjust_rating_summary(instance.event_id, instance._counted_rating, None)
+
+@receiver(post_save, sender=RSVP)
+@receiver(post_delete, sender=RSVP)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_participant_dashboards(sender, instance, origin=None, **kwargs):
+    if _deleted_with_event(origin):
+        return
+    invalidate_dashboards([instance.user_id, instance.event.organizer_id])
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=RSVP)
+@receiver(post_delete, sender=RSVP)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_events_feed_version(sender, origin=None, **kwargs):
+    if sender is not Event and _deleted_with_event(origin):
+        return
+    bump_events_version()
+
+@receiver(post_save, sender=Event)
+def invalidate_event_dashboards(sender, instance, created, update_fields=None, **kwargs):
+    shown, instance._shown_values = instance._shown_values, instance.dashboard_values()
+    if created:
+        invalidate_dashboards([instance.organizer_id])
+        return
+    if update_fields is not None and not set(Event.DASHBOARD_FIELDS).intersection(update_fields):
+        return
+    if shown == instance._shown_values:
+        return
+    invalidate_dashboards([
+        instance.organizer_id, (shown or {}).get('organizer_id'), *instance.rsvps.values_list('user_id', flat=True),
+    ])
+
+@receiver(pre_delete, sender=Event)
+def invalidate_deleted_event_dashboards(sender, instance, **kwargs):
+    invalidate_dashboards([instance.organizer_id, *instance.rsvps.values_list('user_id', flat=True)])
+
+@receiver(post_save, sender=Event)
+def sync_event_days(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not {'start_time', 'end_time'}.intersection(update_fields):
+        return
+    EventDay.sync(instance, created=created)
+
+@receiver(post_save, sender=Event)
+def index_saved_event(sender, instance, created, update_fields=None, using='default', **kwargs):
+    if update_fields is not None and not search.INDEXED_FIELDS.intersection(update_fields):
+        return
+    search.index_event(instance.pk, using=using)
+
+@receiver(post_delete, sender=Event)
+def unindex_deleted_event(sender, instance, using='default', **kwargs):
+    search.remove_event(instance.pk, using=using)
+
+@receiver(post_save, sender=User)
+def reindex_organizer_events(sender, instance, created, update_fields=None, using='default', **kwargs):
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    search.index_organizer(instance.pk, using=using)
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .access import event_access
+
 class IsOrganizerOrReadOnly(permissions.BasePermission):
     """
     Custom permission to only allow organizers of an event to edit it.
@@ -10,7 +12,7 @@ class IsOrganizerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        return obj.organizer == request.user
+        return obj.organizer_id == request.user.id
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
@@ -22,7 +24,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        return obj.user == request.user
+        return obj.user_id == request.user.id
 
 class CanViewPrivateEvent(permissions.BasePermission):
     """
@@ -31,14 +33,4 @@ class CanViewPrivateEvent(permissions.BasePermission):
     """
     
     def has_object_permission(self, request, view, obj):
-        if obj.is_public:
-            return True
-        
-        if not request.user.is_authenticated:
-            return False
-        
-        if obj.organizer == request.user:
-            return True
-        
-        from .models import RSVP
-        return RSVP.objects.filter(event=obj, user=request.user).exists()
+        return event_access(request).can_view(obj.pk, obj.is_public, obj.organizer_id)
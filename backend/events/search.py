@@ -0,0 +1,185 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+# Full-text index over events, kept in the side table `event_search`.
+# SQLite uses an FTS5 virtual table keyed by the event rowid; PostgreSQL uses
+# a weighted tsvector column with a GIN index. Other backends fall back to
+# icontains lookups.
+
+SEARCH_TABLE = 'event_search'
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "title, description, location, organizer, tokenize='unicode61 remove_diacritics 2')",
+]
+SQLITE_DROP = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+
+POSTGRES_CREATE = [
+    f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+    "event_id bigint PRIMARY KEY REFERENCES events (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin ON {SEARCH_TABLE} USING GIN (document)",
+]
+POSTGRES_DROP = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+
+# Column weights: title, description, location, organizer.
+SQLITE_RANK = f"bm25({SEARCH_TABLE}, 10.0, 1.0, 4.0, 2.0)"
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(e.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(e.location, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(u.username, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(e.description, '')), 'C')"
+)
+
+SEARCH_FIELDS = ['title', 'description', 'location', 'organizer__username']
+INDEXED_FIELDS = {'title', 'description', 'location', 'organizer'}
+
+
+def create_index(connection):
+    if connection.vendor == 'sqlite':
+        statements = SQLITE_CREATE
+    elif connection.vendor == 'postgresql':
+        statements = POSTGRES_CREATE
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    reindex(connection)
+
+
+def drop_index(connection):
+    if connection.vendor == 'sqlite':
+        statements = SQLITE_DROP
+    elif connection.vendor == 'postgresql':
+        statements = POSTGRES_DROP
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def reindex(connection, where='1 = 1', params=()):
+    """
+    Rebuild the index rows for the events matching `where` (SQL over the
+    `events` table aliased as `e`) straight from the source tables.
+    """
+    if connection.vendor == 'sqlite':
+        statements = [
+            (f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT e.id FROM events e WHERE {where})", params),
+            (f"INSERT INTO {SEARCH_TABLE} (rowid, title, description, location, organizer) "
+             f"SELECT e.id, e.title, e.description, e.location, u.username "
+             f"FROM events e JOIN auth_user u ON u.id = e.organizer_id WHERE {where}", params),
+        ]
+    elif connection.vendor == 'postgresql':
+        statements = [
+            (f"INSERT INTO {SEARCH_TABLE} (event_id, document) "
+             f"SELECT e.id, {POSTGRES_DOCUMENT} "
+             f"FROM events e JOIN auth_user u ON u.id = e.organizer_id WHERE {where} "
+             f"ON CONFLICT (event_id) DO UPDATE SET document = EXCLUDED.document", params),
+        ]
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement, statement_params in statements:
+            cursor.execute(statement, statement_params)
+
+
+def index_event(event_id, using='default'):
+    reindex(connections[using], 'e.id = %s', [event_id])
+
+
+def index_organizer(user_id, using='default'):
+    reindex(connections[using], 'e.organizer_id = %s', [user_id])
+
+
+def remove_event(event_id, using='default'):
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        sql = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s"
+    elif connection.vendor == 'postgresql':
+        sql = f"DELETE FROM {SEARCH_TABLE} WHERE event_id = %s"
+    else:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [event_id])
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def search_events(queryset, query):
+    """
+    Restrict an Event queryset to matches for `query` and annotate each row
+    with `search_rank` (higher is more relevant). Every term must match,
+    either as a whole word or as a word prefix.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    connection = connections[queryset.db]
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        matches = RawSQL(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match])
+        rank = RawSQL(
+            f"SELECT -{SQLITE_RANK} FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND rowid = events.id",
+            [match],
+            output_field=FloatField()
+        )
+    elif connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        matches = RawSQL(
+            f"SELECT event_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('english', %s)",
+            [tsquery]
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank_cd(document, to_tsquery('english', %s)) FROM {SEARCH_TABLE} "
+            f"WHERE event_id = events.id",
+            [tsquery],
+            output_field=FloatField()
+        )
+    else:
+        condition = Q()
+        for term in terms:
+            term_condition = Q()
+            for field in SEARCH_FIELDS:
+                term_condition |= Q(**{f'{field}__icontains': term})
+            condition &= term_condition
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+def get_search_query(request):
+    return request.query_params.get('q') or request.query_params.get('search') or ''
+
+
+class EventSearchFilter(filters.BaseFilterBackend):
+    """
+    Full-text search over events via `?q=` (`?search=` is kept as an alias).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = get_search_query(request)
+        if not query:
+            return queryset
+        return search_events(queryset, query)
+
+
+class RelevanceOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering filter that sorts search results by relevance unless the
+    client asks for an explicit ordering.
+    """
+
+    def get_default_ordering(self, view):
+        if search_terms(get_search_query(view.request)):
+            return ['-search_rank']
+        return super().get_default_ordering(view)
@@ -1,36 +1,66 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from django.db import models
 from django.contrib.auth.models import User
+from accounts.images import thumbnail_urls
+from .access import event_access
 from .models import Event, RSVP, Review
 
+EMBEDDED_LIMIT = 10
+
+
+class EventListSerializer(serializers.ListSerializer):
+    """
+    Resolves the caller's RSVP status for every event in the list with one
+    query, so that EventSerializer.get_user_rsvp never hits the database.
+    """
+
+    def to_representation(self, data):
+        events = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            user_rsvps = self.context.get('user_rsvps', {})
+            event_access(request).load_rsvps([event.pk for event in events if event.pk not in user_rsvps])
+        return super().to_representation(events)
+
 
 class EventSerializer(serializers.ModelSerializer):
     organizer = serializers.CharField(source='organizer.username', read_only=True)
-    organizer_id = serializers.IntegerField(source='organizer.id', read_only=True)
+    organizer_id = serializers.IntegerField(read_only=True)
     attendee_count = serializers.ReadOnlyField()
+    rating_summary = serializers.ReadOnlyField()
     user_rsvp = serializers.SerializerMethodField()
     can_edit = serializers.SerializerMethodField()
 
     class Meta:
         model = Event
         fields = ['id', 'title', 'description', 'organizer', 'organizer_id', 'location', 
-                 'start_time', 'end_time', 'is_public', 'created_at', 'updated_at', 
-                 'attendee_count', 'user_rsvp', 'can_edit']
+                 'latitude', 'longitude', 'start_time', 'end_time', 'is_public', 'created_at', 'updated_at', 
+                 'attendee_count', 'rating_summary', 'user_rsvp', 'can_edit']
         read_only_fields = ['organizer', 'created_at', 'updated_at']
+        list_serializer_class = EventListSerializer
+
+    def validate(self, attrs):
+        coordinates = [
+            attrs.get(field, getattr(self.instance, field, None)) for field in ('latitude', 'longitude')
+        ]
+        if (coordinates[0] is None) != (coordinates[1] is None):
+            raise serializers.ValidationError("Latitude and longitude must be given together")
+        return attrs
 
     def get_user_rsvp(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            try:
-                rsvp = RSVP.objects.get(event=obj, user=request.user)
-                return rsvp.status
-            except RSVP.DoesNotExist:
-                return None
+            user_rsvps = self.context.get('user_rsvps')
+            if user_rsvps is not None and obj.pk in user_rsvps:
+                return user_rsvps[obj.pk]
+            return event_access(request).user_rsvp(obj.pk)
         return None
 
     def get_can_edit(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.organizer == request.user
+            return obj.organizer_id == request.user.id
         return False
 
     def create(self, validated_data):
@@ -39,6 +69,18 @@ class EventSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class EventSummarySerializer(serializers.ModelSerializer):
+    """
+    The few fields a calendar cell shows.
+    """
+    attendee_count = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Event
+        fields = ['id', 'title', 'location', 'start_time', 'end_time', 'is_public', 'attendee_count']
+        read_only_fields = fields
+
+
 class RSVPSerializer(serializers.ModelSerializer):
     user = serializers.CharField(source='user.username', read_only=True)
     event_title = serializers.CharField(source='event.title', read_only=True)
@@ -46,17 +88,27 @@ class RSVPSerializer(serializers.ModelSerializer):
     class Meta:
         model = RSVP
         fields = ['id', 'event', 'user', 'event_title', 'status', 'created_at', 'updated_at']
-        read_only_fields = ['user', 'created_at', 'updated_at']
+        read_only_fields = ['event', 'user', 'created_at', 'updated_at']
+
+
+class BulkRSVPItemSerializer(serializers.Serializer):
+    event_id = serializers.IntegerField(min_value=1)
+    status = serializers.ChoiceField(choices=RSVP.STATUS_CHOICES, default='going')
+
+
+class BulkRSVPSerializer(serializers.Serializer):
+    rsvps = serializers.ListField(child=BulkRSVPItemSerializer(), allow_empty=False, max_length=100)
 
 
 class ReviewSerializer(serializers.ModelSerializer):
     user = serializers.CharField(source='user.username', read_only=True)
     user_full_name = serializers.SerializerMethodField(read_only=True)
+    user_thumbnails = serializers.SerializerMethodField(read_only=True)
     can_edit = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Review
-        fields = ['id', 'user', 'user_full_name', 'rating', 
+        fields = ['id', 'user', 'user_full_name', 'user_thumbnails', 'rating', 
                  'comment', 'created_at', 'updated_at', 'can_edit']
         read_only_fields = ['user', 'created_at', 'updated_at']
 
@@ -67,10 +119,16 @@ class ReviewSerializer(serializers.ModelSerializer):
             return obj.user.get_full_name()
         return obj.user.username
 
+    def get_user_thumbnails(self, obj):
+        profile = getattr(obj.user, 'profile', None)
+        if profile is None:
+            return None
+        return thumbnail_urls(profile.profile_picture.name, self.context.get('request'))
+
     def get_can_edit(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.user == request.user
+            return obj.user_id == request.user.id
         return False
 
     def validate_rating(self, value):
@@ -85,8 +143,42 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 
 class EventDetailSerializer(EventSerializer):
-    reviews = ReviewSerializer(many=True, read_only=True)
-    rsvps = RSVPSerializer(many=True, read_only=True)
-    
+    """
+    Event detail with the most recent reviews and RSVPs embedded. The full
+    collections are available from the paginated endpoints in
+    `reviews_url` and `rsvps_url`.
+    """
+    reviews = serializers.SerializerMethodField()
+    rsvps = serializers.SerializerMethodField()
+    review_count = serializers.SerializerMethodField()
+    rsvp_count = serializers.SerializerMethodField()
+    reviews_url = serializers.SerializerMethodField()
+    rsvps_url = serializers.SerializerMethodField()
+
     class Meta(EventSerializer.Meta):
-        fields = EventSerializer.Meta.fields + ['reviews', 'rsvps']
+        fields = EventSerializer.Meta.fields + ['reviews', 'rsvps', 'review_count', 'rsvp_count',
+                                                'reviews_url', 'rsvps_url']
+
+    def get_reviews(self, obj):
+        reviews = getattr(obj, 'recent_reviews', None)
+        if reviews is None:
+            reviews = obj.reviews.select_related('user__profile').order_by('-created_at')[:EMBEDDED_LIMIT]
+        return ReviewSerializer(reviews, many=True, context=self.context).data
+
+    def get_rsvps(self, obj):
+        rsvps = getattr(obj, 'recent_rsvps', None)
+        if rsvps is None:
+            rsvps = obj.rsvps.select_related('user', 'event').order_by('-created_at')[:EMBEDDED_LIMIT]
+        return RSVPSerializer(rsvps, many=True, context=self.context).data
+
+    def get_review_count(self, obj):
+        return obj.review_count
+
+    def get_rsvp_count(self, obj):
+        return obj.going_count + obj.maybe_count + obj.not_going_count
+
+    def get_reviews_url(self, obj):
+        return reverse('event-reviews', kwargs={'event_id': obj.pk}, request=self.context.get('request'))
+
+    def get_rsvps_url(self, obj):
+        return reverse('event-rsvps', kwargs={'event_id': obj.pk}, request=self.context.get('request'))
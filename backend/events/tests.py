@@ -1,3 +1,1243 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import math
+import os
+import random
+import re
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import AsyncClient, TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from project.db import replicas
+from project.testing import bearer
+
+from . import cache as event_cache, geo, search
+from .filters import EventFilter
+from .models import Event, RSVP, Review
+from .serializers import EMBEDDED_LIMIT, EventSerializer
+
+
+class RSVPCounterTests(TestCase):
+    """
+    The going/maybe tallies stored on Event follow every RSVP write.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        now = timezone.now()
+        cls.first, cls.second = [
+            Event.objects.create(
+                title=title, description='Meetup', organizer=cls.alice, location='Berlin',
+                start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=2),
+            )
+            for title in ('First', 'Second')
+        ]
+
+    def assertCounts(self, event, going, maybe):
+        event.refresh_from_db()
+        self.assertEqual((event.going_count, event.maybe_count), (going, maybe))
+
+    def assertConsistent(self):
+        call_command('rebuild_rsvp_counts', '--check', stdout=io.StringIO())
+
+    def test_create_change_move_and_delete(self):
+        rsvp = RSVP.objects.create(event=self.first, user=self.bob, status='going')
+        self.assertCounts(self.first, 1, 0)
+
+        rsvp.status = 'maybe'
+        rsvp.save()
+        self.assertCounts(self.first, 0, 1)
+
+        # A reloaded RSVP counts from the stored row, not the one it was created with.
+        RSVP.objects.filter(pk=rsvp.pk).update(status='going')
+        Event.objects.filter(pk=self.first.pk).update(going_count=1, maybe_count=0)
+        rsvp.refresh_from_db()
+        rsvp.status = 'maybe'
+        rsvp.save()
+        self.assertCounts(self.first, 0, 1)
+
+        rsvp.event = self.second
+        rsvp.status = 'going'
+        rsvp.save()
+        self.assertCounts(self.first, 0, 0)
+        self.assertCounts(self.second, 1, 0)
+        self.assertConsistent()
+
+        rsvp.delete()
+        self.assertCounts(self.second, 0, 0)
+        self.assertConsistent()
+
+    def test_rebuild_keeps_rsvps_written_while_it_runs(self):
+        RSVP.objects.create(event=self.first, user=self.bob, status='going')
+        Event.objects.filter(pk=self.first.pk).update(going_count=5, maybe_count=2)
+
+        class Output(io.StringIO):
+            # Another request RSVPs after the drift was found, before the repair.
+            def write(inner, text):
+                if text.startswith('Event ') and not RSVP.objects.filter(user=self.alice).exists():
+                    RSVP.objects.create(event=self.first, user=self.alice, status='maybe')
+                return super().write(text)
+
+        call_command('rebuild_rsvp_counts', stdout=Output())
+        self.assertCounts(self.first, 1, 1)
+        self.assertConsistent()
+
+    def test_update_view_cannot_move_an_rsvp(self):
+        RSVP.objects.create(event=self.first, user=self.bob, status='going')
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        response = client.patch(
+            f'/api/events/{self.first.pk}/rsvp/{self.bob.pk}/', {'event': self.second.pk, 'status': 'maybe'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['event'], self.first.pk)
+        self.assertCounts(self.first, 0, 1)
+        self.assertCounts(self.second, 0, 0)
+        self.assertConsistent()
+
+    def test_user_delete_releases_their_rsvps(self):
+        RSVP.objects.create(event=self.first, user=self.bob, status='going')
+        RSVP.objects.create(event=self.second, user=self.bob, status='maybe')
+        self.bob.delete()
+        self.assertCounts(self.first, 0, 0)
+        self.assertCounts(self.second, 0, 0)
+        self.assertConsistent()
+
+
+class QueryCountTests(TestCase):
+    """
+    Read endpoints run a fixed number of queries whatever the page size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pw') for i in range(4)]
+        now = timezone.now()
+        cls.events = []
+        for i in range(12):
+            event = Event.objects.create(
+                title=f'Event {i}', description='Meetup', organizer=cls.users[i % 4], location='Berlin',
+                start_time=now + timedelta(days=i), end_time=now + timedelta(days=i, hours=2),
+            )
+            for user in cls.users:
+                if user != event.organizer:
+                    RSVP.objects.create(event=event, user=user, status='going')
+                    Review.objects.create(event=event, user=user, rating=4, comment='Good')
+            cls.events.append(event)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def assertQueriesPerPage(self, path, queries, client=None):
+        client = client or self.client
+        for page_size in (2, 10):
+            with self.subTest(path=path, page_size=page_size):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = client.get(f'{path}?page_size={page_size}')
+                self.assertEqual(response.status_code, 200)
+
+    def test_event_list(self):
+        self.assertQueriesPerPage('/api/events/', 1, client=APIClient())
+        self.assertQueriesPerPage('/api/events/', 2)
+
+    def test_dashboard(self):
+        self.assertQueriesPerPage('/api/dashboard/', 2)
+
+    def test_event_list_user_fields(self):
+        # user_rsvp and can_edit for the whole page come from one extra query.
+        self.assertQueriesPerPage('/api/events/', 2)
+        response = self.client.get('/api/events/?page_size=12')
+        for item in response.data['results']:
+            mine = item['organizer_id'] == self.users[0].pk
+            self.assertEqual(item['can_edit'], mine)
+            self.assertEqual(item['user_rsvp'], None if mine else 'going')
+
+    def test_rsvp_list(self):
+        path = f'/api/events/{self.events[1].pk}/rsvps/'
+        self.assertQueriesPerPage(path, 2, client=APIClient())
+        self.assertQueriesPerPage(path, 2)
+
+    def test_event_list_hides_private_events(self):
+        owner, guest, outsider = self.users[1], self.users[2], self.users[3]
+        now = timezone.now()
+        private = [
+            Event.objects.create(
+                title=f'Private {i}', description='Invite only', organizer=owner, location='Berlin',
+                start_time=now + timedelta(days=i), end_time=now + timedelta(days=i, hours=1), is_public=False,
+            )
+            for i in range(3)
+        ]
+        RSVP.objects.create(event=private[0], user=guest, status='maybe')
+        expected = {owner: set(private), guest: {private[0]}, outsider: set()}
+        for user, visible in expected.items():
+            client = APIClient()
+            client.force_authenticate(user)
+            self.assertQueriesPerPage('/api/events/', 2, client=client)
+            response = client.get('/api/events/?page_size=100')
+            shown = {item['id'] for item in response.data['results']}
+            self.assertEqual(shown & {event.pk for event in private}, {event.pk for event in visible})
+            self.assertTrue({event.pk for event in self.events} <= shown)
+        anonymous = APIClient().get('/api/events/?page_size=100')
+        self.assertFalse({item['id'] for item in anonymous.data['results']} & {event.pk for event in private})
+
+    def test_event_detail(self):
+        crowded = Event.objects.create(
+            title='Crowded', description='Meetup', organizer=self.users[0], location='Berlin',
+            start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=2),
+        )
+        for i in range(EMBEDDED_LIMIT + 5):
+            guest = User.objects.create_user(f'guest{i}', f'guest{i}@example.com', 'pw')
+            RSVP.objects.create(event=crowded, user=guest, status='going')
+            Review.objects.create(event=crowded, user=guest, rating=5)
+        for client in (APIClient(), self.client):
+            for event in (self.events[1], crowded):
+                with self.subTest(event=event.title, authenticated=client is self.client):
+                    with self.assertNumQueries(4):
+                        response = client.get(f'/api/events/{event.pk}/')
+                    self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['reviews']), EMBEDDED_LIMIT)
+        self.assertEqual(len(response.data['rsvps']), EMBEDDED_LIMIT)
+        self.assertEqual(response.data['review_count'], EMBEDDED_LIMIT + 5)
+        self.assertEqual(response.data['rsvp_count'], EMBEDDED_LIMIT + 5)
+
+    def test_review_list(self):
+        path = f'/api/events/{self.events[1].pk}/reviews/'
+        self.assertQueriesPerPage(path, 2, client=APIClient())
+        self.assertQueriesPerPage(path, 2)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        now = timezone.now()
+        cls.events = [
+            Event.objects.create(
+                title=f'Event {i}', description='Meetup', organizer=cls.alice, location='Berlin',
+                # Pairs of events share a start time, so the id tie-breaker matters.
+                start_time=now + timedelta(days=i // 2), end_time=now + timedelta(days=i // 2, hours=1),
+            )
+            for i in range(11)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([item['id'] for item in response.data['results']])
+            url = response.data[link]
+        return pages
+
+    def test_forward_and_backward_paging(self):
+        orderings = {
+            '': sorted(self.events, key=lambda event: event.pk, reverse=True),
+            'start_time': sorted(self.events, key=lambda event: (event.start_time, event.pk)),
+            '-start_time': sorted(self.events, key=lambda event: (event.start_time, event.pk), reverse=True),
+        }
+        for ordering, expected in orderings.items():
+            with self.subTest(ordering=ordering):
+                expected = [event.pk for event in expected]
+                forward = self.walk(f'/api/events/?page_size=3&ordering={ordering}', 'next')
+                self.assertEqual([len(page) for page in forward], [3, 3, 3, 2])
+                self.assertEqual(sum(forward, []), expected)
+
+                last = self.client.get(f'/api/events/?page_size=3&ordering={ordering}').data
+                while last['next']:
+                    last = self.client.get(last['next']).data
+                backward = self.walk(last['previous'], 'previous')
+                self.assertEqual(backward, forward[-2::-1])
+
+    def test_tampered_cursors_are_not_found(self):
+        def encode(cursor):
+            return base64.b64encode(json.dumps(cursor).encode()).decode()
+
+        cursors = [
+            'not base64!',
+            encode(['no', 'position']),
+            encode({'p': ['2026-01-01T00:00:00+00:00']}),
+            encode({'p': ['not-a-date', 'x']}),
+            encode({'p': ['2026-01-01T00:00:00+00:00', 'x']}),
+            encode({'p': [None, 1]}),
+            encode({'p': [['2026'], {'id': 1}]}),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/events/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(str(response.data['detail']), 'Invalid cursor')
+        response = self.client.get('/api/events/?ordering=-average_rating', {'cursor': encode({'p': ['high', 1]})})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            f'/api/events/{self.events[0].pk}/reviews/', {'cursor': encode({'p': ['yesterday', 1]})},
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+
+    def create(self, title, description='Meetup', location='Berlin', organizer=None):
+        now = timezone.now()
+        return Event.objects.create(
+            title=title, description=description, location=location, organizer=organizer or self.alice,
+            start_time=now, end_time=now + timedelta(hours=1),
+        )
+
+    def matches(self, query):
+        return list(search.search_events(Event.objects.all(), query).order_by('-search_rank', 'id'))
+
+    def test_title_matches_rank_first(self):
+        in_description = self.create('Evening', description='An introduction to gardening')
+        in_location = self.create('Workshop', location='Gardening club')
+        in_title = self.create('Gardening basics')
+        self.create('Cooking class')
+        self.assertEqual(self.matches('gardening'), [in_title, in_location, in_description])
+
+    def test_prefix_and_every_term_must_match(self):
+        both = self.create('Python workshop')
+        self.create('Python meetup')
+        self.assertEqual(self.matches('pyth work'), [both])
+        self.assertEqual(self.matches('alice'), self.matches('python'))
+        # A query with no words leaves the queryset alone.
+        self.assertEqual(list(search.search_events(Event.objects.all(), '!!')), list(Event.objects.all()))
+
+    def test_index_follows_saves_and_deletes(self):
+        event = self.create('Chess night')
+        self.assertEqual(self.matches('chess'), [event])
+
+        event.title = 'Go night'
+        event.save()
+        self.assertEqual(self.matches('chess'), [])
+        self.assertEqual(self.matches('go'), [event])
+
+        # Saves that leave the indexed fields alone skip the reindex.
+        Event.objects.filter(pk=event.pk).update(title='Bridge night')
+        event.is_public = False
+        event.save(update_fields=['is_public'])
+        self.assertEqual(self.matches('go'), [event])
+
+        event.organizer = self.bob
+        event.save()
+        self.assertEqual(self.matches('bob'), [event])
+        self.bob.username = 'robert'
+        self.bob.save()
+        self.assertEqual(self.matches('robert'), [event])
+
+        event.delete()
+        self.assertEqual(self.matches('bridge'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {search.SEARCH_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_search_endpoint_orders_by_relevance(self):
+        in_description = self.create('Evening', description='Chess for beginners')
+        in_title = self.create('Chess club')
+        response = APIClient().get('/api/events/?q=chess')
+        self.assertEqual([item['id'] for item in response.data['results']], [in_title.pk, in_description.pk])
+
+
+class RatingSummaryTests(TestCase):
+    """
+    average_rating, review_count and the per-rating tallies stored on Event
+    follow every review write.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        cls.carol = User.objects.create_user('carol', 'carol@example.com', 'pw')
+        now = timezone.now()
+        cls.event = Event.objects.create(
+            title='Meetup', description='Meetup', organizer=cls.alice, location='Berlin',
+            start_time=now, end_time=now + timedelta(hours=1),
+        )
+
+    def assertSummary(self, review_count, average_rating):
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.review_count, review_count)
+        self.assertAlmostEqual(self.event.average_rating, average_rating)
+        stored = {field: getattr(self.event, field) for field in self.event.rating_tallies()}
+        self.assertEqual(stored, self.event.rating_tallies())
+
+    def test_create_edit_and_delete(self):
+        self.assertSummary(0, 0)
+        first = Review.objects.create(event=self.event, user=self.bob, rating=5)
+        self.assertSummary(1, 5)
+        Review.objects.create(event=self.event, user=self.carol, rating=2)
+        self.assertSummary(2, 3.5)
+
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        response = client.patch(f'/api/reviews/{first.pk}/', {'rating': 3}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertSummary(2, 2.5)
+
+        # A save that keeps the rating leaves the summary as it is.
+        first.refresh_from_db()
+        first.comment = 'Edited'
+        first.save()
+        self.assertSummary(2, 2.5)
+
+        response = client.delete(f'/api/reviews/{first.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertSummary(1, 2)
+
+    def test_user_delete_removes_their_reviews(self):
+        Review.objects.create(event=self.event, user=self.bob, rating=1)
+        Review.objects.create(event=self.event, user=self.carol, rating=4)
+        self.bob.delete()
+        self.assertSummary(1, 4)
+        self.carol.delete()
+        self.assertSummary(0, 0)
+
+
+class DashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        now = timezone.now()
+        statuses = ['going', 'maybe', 'not_going', 'going', None, 'maybe', 'going']
+        for i, status in enumerate(statuses):
+            event = Event.objects.create(
+                title=f'Event {i}', description='Meetup', organizer=cls.bob, location='Berlin',
+                start_time=now + timedelta(days=i), end_time=now + timedelta(days=i, hours=1), is_public=i != 5,
+            )
+            if status:
+                RSVP.objects.create(event=event, user=cls.alice, status=status)
+        for i in range(4):
+            event = Event.objects.create(
+                title=f'Own {i}', description='Meetup', organizer=cls.alice, location='Berlin',
+                start_time=now + timedelta(days=i), end_time=now + timedelta(days=i, hours=1),
+            )
+            RSVP.objects.create(event=event, user=cls.bob, status='going')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def expected(self):
+        """
+        The dashboard as it was built before the UNION query: every organized
+        event and every going/maybe RSVP, newest first.
+        """
+        request = Request(APIRequestFactory().get('/api/dashboard/'))
+        request.user = self.alice
+        organized = list(Event.objects.filter(organizer=self.alice).order_by('-created_at'))
+        rsvps = RSVP.objects.filter(user=self.alice).select_related('event').order_by('-created_at')
+        rsvped = [rsvp.event for rsvp in rsvps if rsvp.status in ['going', 'maybe']]
+        context = {'request': request}
+        return {
+            'organized_events': EventSerializer(organized, many=True, context=context).data,
+            'rsvped_events': EventSerializer(rsvped, many=True, context=context).data,
+            'rsvp_count': len(rsvped),
+            'organized_count': len(organized),
+        }
+
+    def test_matches_the_per_relation_dashboard(self):
+        expected = self.expected()
+        response = self.client.get('/api/dashboard/')
+        for key, value in expected.items():
+            self.assertEqual(response.data[key], value, key)
+        self.assertEqual(response.data['rsvp_count'], 5)
+        self.assertEqual(
+            [item['title'] for item in response.data['rsvped_events']], ['Event 6', 'Event 5', 'Event 3', 'Event 1', 'Event 0'],
+        )
+
+    def test_pages_split_both_lists(self):
+        expected = self.expected()
+        seen = {'organized_events': [], 'rsvped_events': []}
+        page = 1
+        while True:
+            response = self.client.get('/api/dashboard/', {'page': page, 'page_size': 2})
+            for key in seen:
+                seen[key].extend(response.data[key])
+            if not response.data['has_more']:
+                break
+            page += 1
+        self.assertEqual(page, 3)
+        for key, items in seen.items():
+            self.assertEqual(items, expected[key], key)
+
+    def test_query_count_is_constant(self):
+        for page_size in (1, 2, 50):
+            with self.subTest(page_size=page_size):
+                with self.assertNumQueries(2):
+                    self.client.get('/api/dashboard/', {'page_size': page_size})
+                # A second request is served from the per-user cache.
+                with self.assertNumQueries(0):
+                    self.client.get('/api/dashboard/', {'page_size': page_size})
+
+    def test_only_shown_changes_invalidate_attendee_dashboards(self):
+        event = Event.objects.get(title='Event 0')
+        self.client.get('/api/dashboard/')
+
+        # Bookkeeping saves and saves that change nothing shown neither read
+        # the event's RSVPs nor touch the attendees' dashboards.
+        with CaptureQueriesContext(connection) as queries:
+            event.save(update_fields=['activity_at'])
+            event.save()
+        self.assertFalse([query for query in queries.captured_queries if 'FROM "rsvps"' in query['sql']])
+        with self.assertNumQueries(0):
+            self.client.get('/api/dashboard/')
+
+        event.title = 'Renamed'
+        event.save()
+        titles = [item['title'] for item in self.client.get('/api/dashboard/').data['rsvped_events']]
+        self.assertIn('Renamed', titles)
+
+        # A reloaded event compares against the stored row.
+        Event.objects.filter(pk=event.pk).update(location='Hamburg')
+        event.refresh_from_db()
+        self.client.get('/api/dashboard/')
+        event.save()
+        with self.assertNumQueries(0):
+            self.client.get('/api/dashboard/')
+
+
+class EventsFeedCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        now = timezone.now()
+        cls.event = Event.objects.create(
+            title='Meetup', description='Meetup', organizer=cls.alice, location='Berlin',
+            start_time=now, end_time=now + timedelta(hours=1),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def feed(self):
+        response = self.client.get('/api/events/')
+        self.assertEqual(response.status_code, 200)
+        return {item['id']: item for item in response.data['results']}
+
+    def assertCached(self):
+        with self.assertNumQueries(0):
+            return self.feed()
+
+    def test_repeat_requests_are_served_from_cache(self):
+        self.feed()
+        self.assertCached()
+        # Each query string is cached on its own.
+        with self.assertNumQueries(1):
+            self.client.get('/api/events/?ordering=start_time')
+
+    def test_writes_invalidate_the_feed(self):
+        self.feed()
+        self.event.title = 'Renamed'
+        self.event.save()
+        self.assertEqual(self.feed()[self.event.pk]['title'], 'Renamed')
+        self.assertCached()
+
+        rsvp = RSVP.objects.create(event=self.event, user=self.bob, status='going')
+        self.assertEqual(self.feed()[self.event.pk]['attendee_count'], 1)
+        rsvp.delete()
+        self.assertEqual(self.feed()[self.event.pk]['attendee_count'], 0)
+
+        review = Review.objects.create(event=self.event, user=self.bob, rating=4)
+        self.assertEqual(self.feed()[self.event.pk]['rating_summary']['average'], 4)
+        review.delete()
+        self.assertEqual(self.feed()[self.event.pk]['rating_summary']['average'], 0)
+
+        other = Event.objects.create(
+            title='Second', description='Meetup', organizer=self.bob, location='Berlin',
+            start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=1),
+        )
+        self.assertIn(other.pk, self.feed())
+        other.delete()
+        self.assertNotIn(other.pk, self.feed())
+
+    def lock_key(self, request):
+        return f'events:feed:lock:{event_cache._feed_digest(request)}'
+
+    def test_stale_copy_is_served_while_another_worker_rebuilds(self):
+        request = APIRequestFactory().get('/api/events/')
+        builds = []
+
+        def build():
+            builds.append(event_cache.events_version())
+            return {'build': len(builds)}
+
+        self.assertEqual(event_cache.cached_events_feed(request, build), {'build': 1})
+        self.assertEqual(event_cache.cached_events_feed(request, build), {'build': 1})
+
+        event_cache.bump_events_version()
+        cache.add(self.lock_key(request), 1, 30)
+        # Another worker holds the rebuild lock: the stale copy is served.
+        self.assertEqual(event_cache.cached_events_feed(request, build), {'build': 1})
+        self.assertEqual(len(builds), 1)
+
+        cache.delete(self.lock_key(request))
+        self.assertEqual(event_cache.cached_events_feed(request, build), {'build': 2})
+        self.assertEqual(event_cache.cached_events_feed(request, build), {'build': 2})
+        # The lock is released once the rebuild is stored.
+        self.assertIsNone(cache.get(self.lock_key(request)))
+
+    def test_without_a_stale_copy_every_worker_builds(self):
+        request = APIRequestFactory().get('/api/events/')
+        cache.add(self.lock_key(request), 1, 30)
+        self.assertEqual(event_cache.cached_events_feed(request, lambda: {'built': True}), {'built': True})
+
+    def test_failed_rebuild_releases_the_lock(self):
+        request = APIRequestFactory().get('/api/events/')
+
+        def build():
+            raise RuntimeError('database unavailable')
+
+        with self.assertRaises(RuntimeError):
+            event_cache.cached_events_feed(request, build)
+        self.assertIsNone(cache.get(self.lock_key(request)))
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        now = timezone.now()
+        cls.event = Event.objects.create(
+            title='Meetup', description='Meetup', organizer=cls.alice, location='Berlin',
+            start_time=now, end_time=now + timedelta(hours=1),
+        )
+        cls.private = Event.objects.create(
+            title='Private', description='Meetup', organizer=cls.alice, location='Berlin',
+            start_time=now, end_time=now + timedelta(hours=1), is_public=False,
+        )
+
+    def paths(self, event=None):
+        event = event or self.event
+        return [f'/api/events/{event.pk}/', f'/api/events/{event.pk}/reviews/']
+
+    def validators(self, path, client=None):
+        response = (client or self.client).get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Authorization', response['Vary'])
+        return response['ETag'], response['Last-Modified']
+
+    def test_matching_validators_get_304(self):
+        for path in self.paths():
+            with self.subTest(path=path):
+                etag, last_modified = self.validators(path)
+                # One query for the event's validators, none to render the page.
+                with self.assertNumQueries(1):
+                    response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                response = self.client.get(path, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 304)
+                response = self.client.get(path, HTTP_IF_NONE_MATCH='"stale"')
+                self.assertEqual(response.status_code, 200)
+
+    def test_validators_change_after_writes(self):
+        for path in self.paths():
+            with self.subTest(path=path):
+                etag, _ = self.validators(path)
+                rsvp = RSVP.objects.create(event=self.event, user=self.bob, status='going')
+                after_rsvp, _ = self.validators(path)
+                self.assertNotEqual(after_rsvp, etag)
+                self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+                review = Review.objects.create(event=self.event, user=self.bob, rating=5)
+                after_review, _ = self.validators(path)
+                self.assertNotIn(after_review, [etag, after_rsvp])
+                review.delete()
+                rsvp.delete()
+
+    def test_validators_depend_on_the_caller(self):
+        path = self.paths()[0]
+        anonymous, _ = self.validators(path)
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        self.assertNotEqual(self.validators(path, client)[0], anonymous)
+        # A private event is not validated for callers who may not see it.
+        response = self.client.get(self.paths(self.private)[0], HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(response.has_header('ETag'))
+
+    async def test_async_endpoints_honour_conditional_get(self):
+        client = AsyncClient()
+        for path in self.paths():
+            with self.subTest(path=path):
+                sync_response = await sync_to_async(self.client.get)(path)
+                async_path = path.replace('/api/', '/api/async/')
+                response = await client.get(async_path, headers={'If-None-Match': sync_response['ETag']})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], sync_response['ETag'])
+                self.assertIn('Authorization', response['Vary'])
+                response = await client.get(async_path, headers={'If-Modified-Since': sync_response['Last-Modified']})
+                self.assertEqual(response.status_code, 304)
+                # Another caller's validators differ.
+                response = await client.get(
+                    async_path, headers={'If-None-Match': sync_response['ETag'], **bearer(self.bob)},
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], sync_response['ETag'])
+        response = await client.get(f'/api/async/events/{self.event.pk}/reviews/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], (await sync_to_async(self.client.get)(self.paths()[1]))['ETag'])
+
+
+class BulkRSVPTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        now = timezone.now()
+        cls.events = [
+            Event.objects.create(
+                title=f'Event {i}', description='Meetup', organizer=cls.alice, location='Berlin',
+                start_time=now, end_time=now + timedelta(hours=1), is_public=i != 3,
+            )
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+
+    def post(self, *rsvps):
+        response = self.client.post(
+            '/api/events/rsvps/bulk/', {'rsvps': [{'event_id': event_id, 'status': status} for event_id, status in rsvps]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return {item['event_id']: item for item in response.data['results']}
+
+    def test_results_and_counters(self):
+        first, second, third, private = (event.pk for event in self.events)
+        RSVP.objects.create(event_id=second, user=self.bob, status='going')
+        RSVP.objects.create(event_id=third, user=self.bob, status='maybe')
+
+        results = self.post(
+            (first, 'maybe'), (first, 'going'), (second, 'not_going'), (third, 'maybe'), (private, 'going'), (9999, 'going'),
+        )
+        self.assertEqual(results[first], {'event_id': first, 'status': 'going', 'result': 'created', 'attendee_count': 1})
+        self.assertEqual(results[second]['result'], 'updated')
+        self.assertEqual(results[second]['attendee_count'], 0)
+        self.assertEqual(results[third]['result'], 'unchanged')
+        self.assertEqual(results[private], {'event_id': private, 'error': 'You cannot RSVP to this private event'})
+        self.assertEqual(results[9999], {'event_id': 9999, 'error': 'Event not found'})
+
+        counts = dict(Event.objects.values_list('id', 'going_count'))
+        self.assertEqual([counts[first], counts[second], counts[third], counts[private]], [1, 0, 0, 0])
+        self.assertFalse(RSVP.objects.filter(event_id=private).exists())
+        call_command('rebuild_rsvp_counts', '--check', stdout=io.StringIO())
+
+    def test_statuses_are_read_inside_the_transaction(self):
+        RSVP.objects.create(event=self.events[0], user=self.bob, status='going')
+        with CaptureQueriesContext(connection) as queries:
+            self.post((self.events[0].pk, 'maybe'), (self.events[1].pk, 'going'))
+        statements = [query['sql'] for query in queries.captured_queries]
+        opened = next(i for i, sql in enumerate(statements) if sql.startswith('SAVEPOINT'))
+        read = next(i for i, sql in enumerate(statements) if sql.startswith('SELECT') and 'FROM "rsvps"' in sql)
+        self.assertLess(opened, read)
+        call_command('rebuild_rsvp_counts', '--check', stdout=io.StringIO())
+
+    def test_invalid_payloads(self):
+        for payload in ({}, {'rsvps': []}, {'rsvps': [{'event_id': self.events[0].pk, 'status': 'perhaps'}]}):
+            with self.subTest(payload=payload):
+                response = self.client.post('/api/events/rsvps/bulk/', payload, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(RSVP.objects.exists())
+
+
+class AsyncViewTests(TestCase):
+    """
+    The async read endpoints answer like their synchronous counterparts.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        cls.carol = User.objects.create_user('carol', 'carol@example.com', 'pw')
+        now = timezone.now()
+        cls.events = [
+            Event.objects.create(
+                title=f'Event {i}', description='Meetup', organizer=cls.alice if i % 2 else cls.bob,
+                location='Berlin', start_time=now + timedelta(days=i), end_time=now + timedelta(days=i, hours=1),
+                is_public=i != 2,
+            )
+            for i in range(5)
+        ]
+        for event in cls.events[:3]:
+            RSVP.objects.create(event=event, user=cls.carol, status='going')
+            Review.objects.create(event=event, user=cls.carol, rating=4, comment='Good')
+        RSVP.objects.create(event=cls.events[1], user=cls.bob, status='maybe')
+
+    def setUp(self):
+        cache.clear()
+        self.async_client = AsyncClient()
+
+    async def compare(self, path, user=None):
+        headers = bearer(user) if user else {}
+        expected = await sync_to_async(self.client.get)(f'/api{path}', headers=headers)
+        cache.clear()
+        response = await self.async_client.get(f'/api/async{path}', headers=headers)
+        self.assertEqual(response.status_code, expected.status_code, path)
+        # Links point at the endpoint that was called.
+        data = json.loads(response.content.decode().replace('/api/async/', '/api/'))
+        self.assertEqual(data, expected.json(), path)
+        return response
+
+    async def test_responses_match_the_sync_views(self):
+        private = self.events[2].pk
+        paths = [
+            '/events/', '/events/?page_size=2', '/events/?ordering=start_time',
+            f'/events/{self.events[1].pk}/', f'/events/{private}/', '/events/9999/',
+            f'/events/{self.events[0].pk}/reviews/', f'/events/{self.events[0].pk}/reviews/?page_size=1',
+            '/dashboard/', '/dashboard/?page_size=1&page=2',
+        ]
+        for user in (None, self.alice, self.bob, self.carol):
+            for path in paths:
+                with self.subTest(path=path, user=user and user.username):
+                    await self.compare(path, user)
+
+    async def test_private_event_access(self):
+        private = f'/events/{self.events[2].pk}/'
+        self.assertEqual((await self.compare(private)).status_code, 401)
+        self.assertEqual((await self.compare(private, self.alice)).status_code, 403)
+        self.assertEqual((await self.compare(private, self.bob)).status_code, 200)
+        self.assertEqual((await self.compare(private, self.carol)).status_code, 200)
+
+    async def test_detail_embeds_the_callers_rsvp(self):
+        path = f'/api/async/events/{self.events[1].pk}/'
+        response = await self.async_client.get(path, headers=bearer(self.bob))
+        data = response.json()
+        self.assertEqual(data['user_rsvp'], 'maybe')
+        self.assertEqual([rsvp['status'] for rsvp in data['rsvps']], ['maybe', 'going'])
+        self.assertEqual(len(data['reviews']), 1)
+
+    async def test_only_reads_are_allowed(self):
+        response = await self.async_client.post('/api/async/events/', {}, headers=bearer(self.alice))
+        self.assertEqual(response.status_code, 405)
+        response = await self.async_client.get('/api/async/dashboard/')
+        self.assertEqual(response.status_code, 401)
+
+
+class ReplicaRebuildTests(TestCase):
+    """
+    Cache misses are rebuilt from the primary for a while after the version
+    behind them was replaced, so a lagging replica is never cached.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        now = timezone.now()
+        cls.event = Event.objects.create(
+            title='Meetup', description='Meetup', organizer=cls.alice, location='Berlin',
+            start_time=now, end_time=now + timedelta(hours=1),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        # Record where each read of event data would go, but serve them all
+        # from the primary: the test database has no replica. Authentication
+        # reads are not cached and may use a replica either way.
+        self.reads = []
+        route = replicas.ReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            if model._meta.app_label == 'events':
+                self.reads.append(route(router, model, **hints))
+            return replicas.PRIMARY
+
+        for patcher in [
+            mock.patch.object(replicas, 'REPLICAS', ['replica1']),
+            mock.patch.object(replicas.ReplicaRouter, 'db_for_read', db_for_read),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def read_from(self, path, **kwargs):
+        self.reads.clear()
+        response = self.client.get(path, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return set(self.reads)
+
+    async def aread_from(self, path, user):
+        self.reads.clear()
+        response = await AsyncClient().get(path, headers=bearer(user))
+        self.assertEqual(response.status_code, 200)
+        return set(self.reads)
+
+    def test_feed_is_rebuilt_from_the_primary_after_a_bump(self):
+        self.assertEqual(self.read_from('/api/events/'), {'replica1'})
+
+        self.event.title = 'Renamed'
+        self.event.save()
+        self.assertEqual(self.read_from('/api/events/'), {'default'})
+
+        # Once the replicas have caught up, misses go back to them.
+        cache.delete(event_cache.EVENTS_FRESH_KEY)
+        self.assertEqual(self.read_from('/api/events/?ordering=start_time'), {'replica1'})
+
+    def test_dashboard_is_rebuilt_from_the_primary_after_another_users_rsvp(self):
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.read_from('/api/dashboard/'), {'replica1'})
+
+        RSVP.objects.create(event=self.event, user=self.bob, status='going')
+        self.assertEqual(self.read_from('/api/dashboard/'), {'default'})
+        self.assertEqual(self.read_from('/api/dashboard/', data={'page_size': 5}), {'default'})
+
+        cache.delete(event_cache._fresh_key(self.alice.id))
+        self.assertEqual(self.read_from('/api/dashboard/', data={'page_size': 3}), {'replica1'})
+
+    async def test_async_dashboard_is_rebuilt_from_the_primary(self):
+        self.assertEqual(await self.aread_from('/api/async/dashboard/', self.alice), {'replica1'})
+
+        await RSVP.objects.acreate(event=self.event, user=self.bob, status='going')
+        self.assertEqual(await self.aread_from('/api/async/dashboard/?page_size=5', self.alice), {'default'})
+
+
+# "SCAN <table>" with no index is a full table scan. Scans of subqueries,
+# the FTS virtual table and index scans are fine.
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked with SQLite EXPLAIN QUERY PLAN')
+class QueryPlanTests(TestCase):
+    """
+    Run every read endpoint and EXPLAIN each query it issued; none of them
+    may fall back to a full scan of a table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        now = timezone.now()
+        cls.events = [
+            Event.objects.create(
+                title=f'Event {i}', description='Planning session', organizer=cls.bob if i % 2 else cls.alice,
+                location='Berlin', start_time=now + timedelta(days=i), end_time=now + timedelta(days=i, hours=2),
+                is_public=i != 3,
+            )
+            for i in range(6)
+        ]
+        for event in cls.events[1:4]:
+            RSVP.objects.create(event=event, user=cls.alice, status='going')
+            Review.objects.create(event=event, user=cls.alice, rating=4, comment='Great event')
+
+    def endpoints(self):
+        event_id = self.events[3].pk
+        today = timezone.now()
+        window = f'{(today + timedelta(days=1)).date()}T00:00:00Z,{(today + timedelta(days=3)).date()}T00:00:00Z'
+        return [
+            '/api/events/',
+            '/api/events/?ordering=start_time',
+            '/api/events/?ordering=-average_rating',
+            '/api/events/?ordering=-review_count',
+            '/api/events/?is_public=true',
+            f'/api/events/?organizer={self.bob.pk}',
+            '/api/events/?q=planning',
+            f'/api/events/?start_after={today.date()}T00:00:00Z',
+            f'/api/events/?overlaps={window}',
+            f'/api/events/calendar/{today.year}/{today.month}/',
+            '/api/events/?near=52.52,13.40&radius=25',
+            f'/api/events/{event_id}/',
+            f'/api/events/{event_id}/reviews/',
+            f'/api/events/{event_id}/rsvps/',
+            '/api/dashboard/',
+            '/api/auth/profile/',
+        ]
+
+    def full_scans(self, sql):
+        tables = set(connection.introspection.table_names())
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[3] for row in cursor.fetchall()]
+        return [detail for detail in plan if (match := FULL_SCAN.match(detail)) and match.group(1) in tables]
+
+    def test_endpoint_queries_use_indexes(self):
+        authenticated = APIClient()
+        authenticated.force_authenticate(self.alice)
+        for client in (APIClient(), authenticated):
+            for path in self.endpoints():
+                with self.subTest(path=path, authenticated=client is authenticated):
+                    with CaptureQueriesContext(connection) as queries:
+                        client.get(path)
+                    for query in queries.captured_queries:
+                        if not query['sql'].startswith('SELECT'):
+                            continue
+                        self.assertEqual(self.full_scans(query['sql']), [], query['sql'])
+
+
+class CalendarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+
+    def create_event(self, start, end, **kwargs):
+        fields = {'title': 'Event', 'description': 'Event', 'organizer': self.bob, 'location': 'Berlin'}
+        fields.update(kwargs)
+        return Event.objects.create(start_time=start, end_time=end, **fields)
+
+    def at(self, day, hour=0):
+        return datetime(2026, 3, day, hour, tzinfo=dt_timezone.utc)
+
+    def calendar(self, client=None):
+        response = (client or APIClient()).get('/api/events/calendar/2026/3/')
+        self.assertEqual(response.status_code, 200)
+        return {day['date']: [event['id'] for event in day['events']] for day in response.data['days']}
+
+    def test_month_buckets_events_by_day(self):
+        single = self.create_event(self.at(2, 9), self.at(2, 11))
+        spanning = self.create_event(self.at(30, 20), datetime(2026, 4, 2, tzinfo=dt_timezone.utc))
+        until_midnight = self.create_event(self.at(5, 22), self.at(6))
+        private = self.create_event(self.at(2, 12), self.at(2, 13), is_public=False)
+
+        days = self.calendar()
+        self.assertEqual(len(days), 31)
+        self.assertEqual(days['2026-03-02'], [single.pk])
+        self.assertEqual(days['2026-03-05'], [until_midnight.pk])
+        self.assertEqual(days['2026-03-06'], [])
+        self.assertEqual(days['2026-03-30'], [spanning.pk])
+        self.assertEqual(days['2026-03-31'], [spanning.pk])
+
+        organizer = APIClient()
+        organizer.force_authenticate(self.bob)
+        self.assertEqual(self.calendar(organizer)['2026-03-02'], [single.pk, private.pk])
+
+    def test_moving_an_event_moves_its_days(self):
+        event = self.create_event(self.at(2, 9), self.at(3, 11))
+        event.start_time, event.end_time = self.at(20, 9), self.at(20, 11)
+        event.save()
+
+        days = self.calendar()
+        self.assertEqual(days['2026-03-02'], [])
+        self.assertEqual(days['2026-03-20'], [event.pk])
+        self.assertEqual(list(event.days.values_list('day', flat=True)), [date(2026, 3, 20)])
+
+    def test_invalid_month(self):
+        self.assertEqual(APIClient().get('/api/events/calendar/2026/13/').status_code, 400)
+
+    def test_range_filters(self):
+        early = self.create_event(self.at(2, 9), self.at(4, 11))
+        late = self.create_event(self.at(10, 9), self.at(10, 11))
+
+        def ids(query):
+            return [event['id'] for event in APIClient().get(f'/api/events/?{query}').data['results']]
+
+        self.assertEqual(ids('start_after=2026-03-05T00:00:00Z'), [late.pk])
+        self.assertEqual(ids('start_before=2026-03-05T00:00:00Z'), [early.pk])
+        self.assertEqual(ids('overlaps=2026-03-03T00:00:00Z,2026-03-03T01:00:00Z'), [early.pk])
+        self.assertEqual(ids('overlaps=2026-03-04T11:00:00Z,2026-03-10T09:00:00Z'), [])
+        self.assertEqual(APIClient().get('/api/events/?overlaps=2026-03-03T00:00:00Z').status_code, 400)
+
+
+class NearFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        start = timezone.now()
+        rng = random.Random(7)
+        points = [(52.52, 13.40), (52.60, 13.40), (52.52, 13.75), (48.85, 2.35), (0.0, 179.95), (0.0, -179.95),
+                  (89.9, 0.0), (89.9, 180.0)]
+        points += [(52.52 + rng.uniform(-1, 1), 13.40 + rng.uniform(-1, 1)) for _ in range(200)]
+        for latitude, longitude in points:
+            Event.objects.create(
+                title='Event', description='Event', organizer=cls.organizer, location='Somewhere',
+                latitude=latitude, longitude=longitude, start_time=start, end_time=start + timedelta(hours=1),
+            )
+        Event.objects.create(title='Event', description='Event', organizer=cls.organizer, location='Nowhere',
+                             start_time=start, end_time=start + timedelta(hours=1))
+
+    def distance(self, event, latitude, longitude):
+        lat1, lat2 = math.radians(latitude), math.radians(event.latitude)
+        dlat, dlng = lat2 - lat1, math.radians(event.longitude - longitude)
+        a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng / 2) ** 2
+        return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+    def near(self, latitude, longitude, radius):
+        response = APIClient().get('/api/events/', {'near': f'{latitude},{longitude}', 'radius': radius, 'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        ids = [event['id'] for event in response.data['results']]
+        while response.data['next']:
+            response = APIClient().get(response.data['next'])
+            ids.extend(event['id'] for event in response.data['results'])
+        return sorted(ids)
+
+    def test_matches_exact_distance(self):
+        for latitude, longitude, radius in [(52.52, 13.40, 0.5), (52.52, 13.40, 10), (52.52, 13.40, 30),
+                                            (52.7, 13.1, 55), (0.0, 180.0, 20), (90.0, 0.0, 50), (48.85, 2.35, 500)]:
+            with self.subTest(latitude=latitude, longitude=longitude, radius=radius):
+                expected = sorted(
+                    event.pk for event in Event.objects.exclude(latitude=None)
+                    if self.distance(event, latitude, longitude) <= radius
+                )
+                self.assertTrue(expected)
+                self.assertEqual(self.near(latitude, longitude, radius), expected)
+
+    def test_distance_is_checked_in_the_query(self):
+        start = timezone.now()
+        rng = random.Random(11)
+        events = []
+        for _ in range(1500):
+            event = Event(
+                title='Crowded', description='Event', organizer=self.organizer, location='Alexanderplatz',
+                latitude=52.52 + rng.uniform(-0.001, 0.001), longitude=13.41 + rng.uniform(-0.001, 0.001),
+                start_time=start, end_time=start + timedelta(hours=1),
+            )
+            event.geohash = event.compute_geohash()
+            events.append(event)
+        Event.objects.bulk_create(events)
+
+        queryset = EventFilter({'near': '52.52,13.41', 'radius': 1}, queryset=Event.objects.all()).qs
+        # The candidates are neither read nor sent back as a list of ids.
+        _, params = queryset.query.sql_with_params()
+        self.assertLess(len(params), 50)
+        with self.assertNumQueries(1):
+            self.assertEqual(queryset.filter(title='Crowded').count(), 1500)
+
+    def test_geohash_follows_coordinates(self):
+        event = Event.objects.exclude(latitude=None).first()
+        event.latitude, event.longitude = 48.85, 2.35
+        event.save(update_fields=['latitude', 'longitude'])
+        self.assertEqual(Event.objects.get(pk=event.pk).geohash, geo.encode(48.85, 2.35))
+        event.latitude = event.longitude = None
+        event.save()
+        self.assertIsNone(Event.objects.get(pk=event.pk).geohash)
+
+    def test_invalid_parameters(self):
+        for query in ['near=52.5', 'near=95,10', 'near=52.5,13.4&radius=0', 'near=52.5,13.4&radius=5000']:
+            with self.subTest(query=query):
+                self.assertEqual(APIClient().get(f'/api/events/?{query}').status_code, 400)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        start = timezone.now()
+        cls.event = Event.objects.create(title='Event', description='Event', organizer=cls.organizer,
+                                         location='Berlin', start_time=start, end_time=start + timedelta(hours=1))
+        for index, status in enumerate(['going', 'maybe', 'going']):
+            user = User.objects.create_user(f'guest{index}', f'guest{index}@example.com', 'pw')
+            RSVP.objects.create(event=cls.event, user=user, status=status)
+            Review.objects.create(event=cls.event, user=user, rating=index + 2, comment=f'=cmd|{index}')
+
+    def export(self, path, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.organizer)
+        return client.get(f'/api/events/{self.event.pk}/{path}', HTTP_ACCEPT='text/csv')
+
+    def test_csv_export_streams_rows(self):
+        response = self.export('rsvps/export.csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,username,full_name,status,created_at,updated_at')
+        self.assertEqual([line.split(',')[3] for line in lines[1:]], ['going', 'going', 'maybe'])
+
+    def test_csv_export_defuses_formulas(self):
+        lines = b''.join(self.export('reviews/export.csv').streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[3] for line in lines[1:]], ["'=cmd|0", "'=cmd|1", "'=cmd|2"])
+
+    def test_ndjson_export(self):
+        response = self.export('reviews/export.ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['rating'] for row in rows], [2, 3, 4])
+        self.assertEqual(rows[0]['username'], 'guest0')
+
+    def test_only_the_organizer_may_export(self):
+        guest = User.objects.get(username='guest0')
+        self.assertEqual(self.export('rsvps/export.csv', user=guest).status_code, 403)
+        self.assertEqual(self.export('rsvps/export.xlsx').status_code, 404)
+
+
+class ImportEventsTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def run_import(self, name, content, *args):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        call_command('import_events', path, '--workers', '0', *args, stdout=io.StringIO())
+        return path
+
+    def test_csv_import_validates_and_indexes_rows(self):
+        path = self.run_import('events.csv', (
+            'title,description,organizer,location,latitude,longitude,start_time,end_time,is_public\n'
+            'Harbour planning,Boats,bob,Hamburg,53.55,9.99,2026-03-02T22:00:00Z,2026-03-03T02:00:00Z,false\n'
+            'Orphan,No organizer,ghost,Nowhere,,,2026-03-02T09:00:00Z,2026-03-02T10:00:00Z,true\n'
+            ',Missing title,bob,Berlin,,,2026-03-02T09:00:00Z,2026-03-02T10:00:00Z,true\n'
+            'Half located,Only latitude,bob,Berlin,52.5,,2026-03-02T09:00:00Z,2026-03-02T10:00:00Z,true\n'
+            'Garden party,Flowers,bob,Berlin,,,2026-03-04T09:00:00Z,2026-03-04T10:00:00Z,\n'
+        ), '--batch-size', '2')
+
+        harbour = Event.objects.get(title='Harbour planning')
+        self.assertEqual(harbour.organizer, self.organizer)
+        self.assertFalse(harbour.is_public)
+        self.assertEqual(harbour.geohash, geo.encode(53.55, 9.99))
+        self.assertEqual(list(harbour.days.values_list('day', flat=True)), [date(2026, 3, 2), date(2026, 3, 3)])
+        self.assertTrue(Event.objects.get(title='Garden party').is_public)
+        self.assertEqual(Event.objects.count(), 2)
+
+        client = APIClient()
+        client.force_authenticate(self.organizer)
+        self.assertEqual([event['id'] for event in client.get('/api/events/?q=harbour').data['results']], [harbour.pk])
+
+        with open(f'{path}.rejected.ndjson', encoding='utf-8') as f:
+            rejected = [json.loads(line) for line in f]
+        self.assertEqual([row['line'] for row in rejected], [3, 4, 5])
+        self.assertEqual(rejected[0]['errors'], {'organizer': ["Unknown user 'ghost'"]})
+        self.assertIn('title', rejected[1]['errors'])
+        self.assertEqual(rejected[2]['row']['title'], 'Half located')
+
+    def test_ndjson_import_reports_unparseable_lines(self):
+        row = {'title': 'Launch', 'description': 'Rocket', 'organizer': 'bob', 'location': 'Bremen',
+               'start_time': '2026-03-02T09:00:00Z', 'end_time': '2026-03-02T10:00:00Z'}
+        path = self.run_import('events.ndjson', f'{json.dumps(row)}\n{{not json\n\n[1, 2]\n')
+
+        self.assertEqual(list(Event.objects.values_list('title', flat=True)), ['Launch'])
+        with open(f'{path}.rejected.ndjson', encoding='utf-8') as f:
+            self.assertEqual([json.loads(line)['line'] for line in f], [2, 4])
+
+    def test_missing_file(self):
+        path = os.path.join(self.directory.name, 'missing.csv')
+        for args in [[], ['--workers', '0']]:
+            with self.subTest(args=args):
+                with self.assertRaisesMessage(CommandError, f'Cannot read {path}: '):
+                    call_command('import_events', path, *args, stdout=io.StringIO())
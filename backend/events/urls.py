@@ -1,15 +1,28 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('events/', views.EventListCreateView.as_view(), name='event-list-create'),
     path('events/<int:pk>/', views.EventDetailView.as_view(), name='event-detail'),
+    path('events/calendar/<int:year>/<int:month>/', views.event_calendar, name='event-calendar'),
     
+    path('events/rsvps/bulk/', views.BulkRSVPView.as_view(), name='event-rsvp-bulk'),
     path('events/<int:event_id>/rsvp/', views.EventRSVPView.as_view(), name='event-rsvp'),
+    path('events/<int:event_id>/rsvps/', views.EventRSVPListView.as_view(), name='event-rsvps'),
+    path('events/<int:event_id>/rsvps/export.<str:fmt>', views.EventExportView.as_view(kind='rsvps'),
+         name='event-rsvps-export'),
     path('events/<int:event_id>/rsvp/<int:user_id>/', views.UserRSVPUpdateView.as_view(), name='rsvp-update'),
     
     path('events/<int:event_id>/reviews/', views.EventReviewListCreateView.as_view(), name='event-reviews'),
+    path('events/<int:event_id>/reviews/export.<str:fmt>', views.EventExportView.as_view(kind='reviews'),
+         name='event-reviews-export'),
     path('reviews/<int:pk>/', views.ReviewDetailView.as_view(), name='review-detail'),
     
     path('dashboard/', views.user_dashboard, name='user-dashboard'),
+    
+    # Async read path for ASGI deployments (project/asgi.py).
+    path('async/events/', async_views.event_list, name='async-event-list'),
+    path('async/events/<int:pk>/', async_views.event_detail, name='async-event-detail'),
+    path('async/events/<int:event_id>/reviews/', async_views.event_reviews, name='async-event-reviews'),
+    path('async/dashboard/', async_views.user_dashboard, name='async-user-dashboard'),
 ]
@@ -1,24 +1,40 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters
-from django.db.models import Q
-from .models import Event, RSVP, Review
-from .serializers import EventSerializer, EventDetailSerializer, RSVPSerializer, ReviewSerializer
+from django.db import transaction
+from django.core.cache import cache
+from django.db.models import CharField, F, Prefetch, Value
+from django.shortcuts import get_object_or_404
+from datetime import date, timedelta
+from accounts.authentication import StatelessReadJWTAuthentication
+from .models import Event, EventDay, RSVP, Review, event_days
+from .serializers import (EMBEDDED_LIMIT, BulkRSVPSerializer, EventSerializer, EventDetailSerializer,
+                          EventSummarySerializer, RSVPSerializer, ReviewSerializer)
 from .permissions import IsOrganizerOrReadOnly, IsOwnerOrReadOnly, CanViewPrivateEvent
+from .access import event_access
+from .export import FORMATS, ExportContentNegotiation, export_response
+from .filters import EventFilter
+from .pagination import KeysetPagination
+from .search import EventSearchFilter, RelevanceOrderingFilter
+from .conditional import conditional_get, event_detail_etag, event_reviews_etag
+from .cache import (DASHBOARD_CACHE_TIMEOUT, bump_events_version, cached_events_feed, dashboard_cache_key,
+                    dashboard_rebuild_reads, invalidate_dashboards)
 import logging
 
 logger = logging.getLogger(__name__)
 
+ORGANIZER_ROLE = 'organizer'
+
 
 class EventListCreateView(generics.ListCreateAPIView):
+    authentication_classes = [StatelessReadJWTAuthentication]
     serializer_class = EventSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['is_public', 'organizer']
-    search_fields = ['title', 'description', 'location', 'organizer__username']
-    ordering_fields = ['created_at', 'start_time', 'title']
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, EventSearchFilter, RelevanceOrderingFilter]
+    filterset_class = EventFilter
+    ordering_fields = ['created_at', 'start_time', 'title', 'average_rating', 'review_count']
     ordering = ['-created_at']
 
     def get_permissions(self):
@@ -29,40 +45,43 @@ class EventListCreateView(generics.ListCreateAPIView):
         return [permission() for permission in permission_classes]
 
     def get_queryset(self):
-        queryset = Event.objects.all()
-        user = self.request.user
-        
-        logger.info(f"User authenticated: {user.is_authenticated}")
-        logger.info(f"Total events in database: {queryset.count()}")
-        
-        if not user.is_authenticated:
-            public_queryset = queryset.filter(is_public=True)
-            logger.info(f"Public events for unauthenticated user: {public_queryset.count()}")
-            return public_queryset
-        
-        public_events = Q(is_public=True)
-        organized_events = Q(organizer=user)
-        rsvped_events = Q(rsvps__user=user)
-        
-        filtered_queryset = queryset.filter(public_events | organized_events | rsvped_events).distinct()
-        logger.info(f"Filtered events for authenticated user {user.username}: {filtered_queryset.count()}")
-        
-        return filtered_queryset
+        return Event.objects.visible_to(self.request.user).select_related('organizer')
 
     def perform_create(self, serializer):
         event = serializer.save(organizer=self.request.user)
         logger.info(f"Created event: {event.title} by {self.request.user.username}")
 
     def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            response = super().list(request, *args, **kwargs)
+        else:
+            # Anonymous callers all see the same public feed.
+            data = cached_events_feed(request, lambda: super(EventListCreateView, self).list(request, *args, **kwargs).data)
+            response = Response(data)
         logger.info(f"API Response - Events count: {len(response.data.get('results', response.data))}")
         return response
 
 
 class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
+    authentication_classes = [StatelessReadJWTAuthentication]
     queryset = Event.objects.all()
     permission_classes = [CanViewPrivateEvent, IsOrganizerOrReadOnly]
     
+    def get_queryset(self):
+        queryset = Event.objects.select_related('organizer')
+        if self.request.method == 'GET':
+            recent_reviews = Review.objects.select_related('user__profile').order_by('-created_at')
+            recent_rsvps = RSVP.objects.select_related('user').order_by('-created_at')
+            queryset = queryset.prefetch_related(
+                Prefetch('reviews', queryset=recent_reviews[:EMBEDDED_LIMIT], to_attr='recent_reviews'),
+                Prefetch('rsvps', queryset=recent_rsvps[:EMBEDDED_LIMIT], to_attr='recent_rsvps'),
+            )
+        return queryset
+    
+    @conditional_get(event_detail_etag)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+    
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return EventDetailSerializer
@@ -70,12 +89,8 @@ class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_object(self):
         obj = super().get_object()
-        if self.request.user.is_authenticated:
-            try:
-                rsvp = RSVP.objects.get(event=obj, user=self.request.user)
-                obj.user_rsvp = rsvp.status
-            except RSVP.DoesNotExist:
-                obj.user_rsvp = None
+        # Already loaded by CanViewPrivateEvent or the ETag check when they needed it.
+        obj.user_rsvp = event_access(self.request).user_rsvp(obj.pk)
         return obj
 
 
@@ -90,7 +105,7 @@ class EventRSVPView(generics.GenericAPIView):
             return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
         
         if not event.is_public:
-            if event.organizer != request.user:
+            if event.organizer_id != request.user.id:
                 return Response({'error': 'You cannot RSVP to this private event'}, 
                               status=status.HTTP_403_FORBIDDEN)
         
@@ -99,27 +114,134 @@ class EventRSVPView(generics.GenericAPIView):
         if status_value not in ['going', 'maybe', 'not_going']:
             return Response({'error': 'Invalid RSVP status'}, status=status.HTTP_400_BAD_REQUEST)
         
-        rsvp, created = RSVP.objects.get_or_create(
-            event=event,
-            user=request.user,
-            defaults={'status': status_value}
-        )
-        
-        if not created:
-            rsvp.status = status_value
-            rsvp.save()
+        with transaction.atomic():
+            rsvp, created = RSVP.objects.select_for_update().get_or_create(
+                event=event,
+                user=request.user,
+                defaults={'status': status_value}
+            )
+            
+            if not created and rsvp.status != status_value:
+                rsvp.status = status_value
+                rsvp.save()
         
-        if hasattr(event, 'update_attendee_count'):
-            event.update_attendee_count()
+        event.refresh_from_db(fields=list(Event.COUNTER_FIELDS.values()))
         
         serializer = RSVPSerializer(rsvp, context={'request': request})
         return Response({
             'message': f'RSVP updated to {status_value}',
             'rsvp': serializer.data,
-            'attendee_count': event.attendee_count if hasattr(event, 'attendee_count') else 0
+            'attendee_count': event.attendee_count
         }, status=status.HTTP_200_OK)
 
 
+class BulkRSVPView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkRSVPSerializer
+    
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        
+        # Later entries for the same event win.
+        wanted = {}
+        for item in serializer.validated_data['rsvps']:
+            wanted[item['event_id']] = item['status']
+        
+        results = []
+        changed = []
+        with transaction.atomic():
+            events = {
+                row['id']: row for row in
+                Event.objects.filter(pk__in=list(wanted)).values('id', 'is_public', 'organizer_id')
+            }
+            # Lock the caller's existing RSVPs, as EventRSVPView does, so the
+            # statuses the counter moves start from are the ones overwritten.
+            current = dict(
+                RSVP.objects.select_for_update().filter(user_id=user.id, event_id__in=list(events))
+                .order_by('event_id').values_list('event_id', 'status')
+            )
+            for event_id, status_value in wanted.items():
+                event = events.get(event_id)
+                current_status = current.get(event_id)
+                if event is None:
+                    results.append({'event_id': event_id, 'error': 'Event not found'})
+                elif not event['is_public'] and event['organizer_id'] != user.id:
+                    results.append({'event_id': event_id, 'error': 'You cannot RSVP to this private event'})
+                elif current_status == status_value:
+                    results.append({'event_id': event_id, 'status': status_value, 'result': 'unchanged'})
+                else:
+                    changed.append((event_id, current_status, status_value))
+                    results.append({
+                        'event_id': event_id,
+                        'status': status_value,
+                        'result': 'created' if current_status is None else 'updated',
+                    })
+            
+            if changed:
+                RSVP.objects.bulk_create(
+                    [RSVP(event_id=event_id, user=user, status=new_status) for event_id, _, new_status in changed],
+                    update_conflicts=True,
+                    unique_fields=['event', 'user'],
+                    update_fields=['status', 'updated_at'],
+                )
+                Event.apply_rsvp_moves(changed)
+        
+        if changed:
+            # bulk_create bypasses the model signals, so invalidate here.
+            invalidate_dashboards([user.id, *(events[event_id]['organizer_id'] for event_id, _, _ in changed)])
+            bump_events_version()
+        
+        counts = dict(
+            Event.objects.filter(pk__in=[item['event_id'] for item in results if 'error' not in item])
+            .values_list('id', 'going_count')
+        )
+        for item in results:
+            if 'error' not in item:
+                item['attendee_count'] = counts.get(item['event_id'], 0)
+        
+        logger.info(f"Bulk RSVP by {user.username}: {len(changed)} changed of {len(results)}")
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+class EventRSVPListView(generics.ListAPIView):
+    authentication_classes = [StatelessReadJWTAuthentication]
+    serializer_class = RSVPSerializer
+    permission_classes = [CanViewPrivateEvent]
+    pagination_class = KeysetPagination
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        event = get_object_or_404(Event, pk=self.kwargs.get('event_id'))
+        self.check_object_permissions(self.request, event)
+        return RSVP.objects.filter(event=event).select_related('user', 'event')
+
+
+class EventExportView(generics.GenericAPIView):
+    """
+    Stream an event's RSVPs or reviews (`kind`) as CSV or NDJSON. Only the
+    organizer may export.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    content_negotiation_class = ExportContentNegotiation
+    kind = None
+    
+    def get(self, request, event_id, fmt):
+        if fmt not in FORMATS:
+            return Response({'error': 'Unsupported export format'}, status=status.HTTP_404_NOT_FOUND)
+        
+        organizer_id = Event.objects.filter(pk=event_id).values_list('organizer_id', flat=True).first()
+        if organizer_id is None:
+            return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+        if organizer_id != request.user.id:
+            return Response({'error': 'Only the organizer can export this event'},
+                          status=status.HTTP_403_FORBIDDEN)
+        
+        logger.info(f"Export of {self.kind} for event {event_id} by {request.user.username}")
+        return export_response(request, self.kind, event_id, fmt)
+
+
 class UserRSVPUpdateView(generics.UpdateAPIView):
     queryset = RSVP.objects.all()
     serializer_class = RSVPSerializer
@@ -132,12 +254,19 @@ class UserRSVPUpdateView(generics.UpdateAPIView):
 
 
 class EventReviewListCreateView(generics.ListCreateAPIView):
+    authentication_classes = [StatelessReadJWTAuthentication]
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    ordering = ['-created_at']
+    
+    @conditional_get(event_reviews_etag)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
     
     def get_queryset(self):
         event_id = self.kwargs.get('event_id')
-        return Review.objects.filter(event_id=event_id).order_by('-created_at')
+        return Review.objects.filter(event_id=event_id).select_related('user__profile').order_by('-created_at')
     
     def create(self, request, *args, **kwargs):
         event_id = self.kwargs.get('event_id')
@@ -167,7 +296,8 @@ class EventReviewListCreateView(generics.ListCreateAPIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            review = serializer.save(event=event, user=request.user)
+            with transaction.atomic():
+                review = serializer.save(event=event, user=request.user)
             logger.info(f"Created review for event {event.title} by {request.user.username}")
             
             return Response(
@@ -183,39 +313,136 @@ class EventReviewListCreateView(generics.ListCreateAPIView):
 
 
 class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+    authentication_classes = [StatelessReadJWTAuthentication]
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
+
+DASHBOARD_PAGE_SIZE = 50
+DASHBOARD_MAX_PAGE_SIZE = 100
+
+
+def dashboard_params(request):
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', DASHBOARD_PAGE_SIZE)), 1), DASHBOARD_MAX_PAGE_SIZE)
+    except ValueError:
+        return None
+    return page, page_size
+
+
+def dashboard_page_ids(organized_ids, rsvped_ids, page, page_size):
+    offset = (page - 1) * page_size
+    return organized_ids[offset:offset + page_size], rsvped_ids[offset:offset + page_size]
+
+
+def dashboard_snapshot(request, rsvp_map, organized_ids, rsvped_ids, events, page, page_size):
+    organized_page, rsvped_page = dashboard_page_ids(organized_ids, rsvped_ids, page, page_size)
+    context = {'request': request, 'user_rsvps': rsvp_map}
+    return {
+        'organized_events': EventSerializer([events[pk] for pk in organized_page if pk in events], many=True, context=context).data,
+        'rsvped_events': EventSerializer([events[pk] for pk in rsvped_page if pk in events], many=True, context=context).data,
+        'rsvp_count': len(rsvped_ids),
+        'organized_count': len(organized_ids),
+        'page': page,
+        'page_size': page_size,
+        'has_more': page * page_size < max(len(organized_ids), len(rsvped_ids)),
+    }
+
 
 @api_view(['GET'])
+@authentication_classes([StatelessReadJWTAuthentication])
 @permission_classes([permissions.IsAuthenticated])
 def user_dashboard(request):
     user = request.user
     
-    organized_events = Event.objects.filter(organizer=user).order_by('-created_at')
+    params = dashboard_params(request)
+    if params is None:
+        return Response({'error': 'Invalid page parameters'}, status=status.HTTP_400_BAD_REQUEST)
+    page, page_size = params
+    
+    cache_key = dashboard_cache_key(user.id, page, page_size)
+    snapshot = cache.get(cache_key)
+    if snapshot is not None:
+        return Response(snapshot)
     
-    user_rsvps = RSVP.objects.filter(user=user).select_related('event').order_by('-created_at')
+    with dashboard_rebuild_reads(user.id):
+        # One query lists both the user's RSVPs and the events they organize,
+        # newest first; a second loads just the events on the requested page.
+        # Every column is an annotation so both halves of the UNION select them
+        # in the same order.
+        rsvp_rows = (
+            RSVP.objects.filter(user_id=user.id).order_by()
+            .annotate(ref=F('event_id'), role=F('status'), stamp=F('created_at'))
+            .values_list('ref', 'role', 'stamp')
+        )
+        organized_rows = (
+            Event.objects.filter(organizer_id=user.id).order_by()
+            .annotate(ref=F('id'), role=Value(ORGANIZER_ROLE, output_field=CharField()), stamp=F('created_at'))
+            .values_list('ref', 'role', 'stamp')
+        )
+        rsvp_map = {}
+        organized_ids = []
+        rsvped_ids = []
+        for event_id, role, _ in rsvp_rows.union(organized_rows, all=True).order_by('-stamp'):
+            if role == ORGANIZER_ROLE:
+                organized_ids.append(event_id)
+                rsvp_map.setdefault(event_id, None)
+            else:
+                rsvp_map[event_id] = role
+                if role in ['going', 'maybe']:
+                    rsvped_ids.append(event_id)
+        
+        organized_page, rsvped_page = dashboard_page_ids(organized_ids, rsvped_ids, page, page_size)
+        events = Event.objects.select_related('organizer').in_bulk(organized_page + rsvped_page)
     
-    rsvped_events = [rsvp.event for rsvp in user_rsvps if rsvp.status in ['going', 'maybe']]
+    snapshot = dashboard_snapshot(request, rsvp_map, organized_ids, rsvped_ids, events, page, page_size)
+    cache.set(cache_key, snapshot, DASHBOARD_CACHE_TIMEOUT)
+    return Response(snapshot)
+
+
+CALENDAR_FIELDS = ['id', 'title', 'location', 'start_time', 'end_time', 'is_public', 'going_count']
+
+
+@api_view(['GET'])
+@authentication_classes([StatelessReadJWTAuthentication])
+@permission_classes([permissions.AllowAny])
+def event_calendar(request, year, month):
+    """
+    The events visible to the caller that touch the given month, bucketed
+    per day (project time zone). A multi-day event appears on every day it
+    touches. Candidates are read from event_days, so the cost depends on
+    the month, not on the size of the events table.
+    """
+    if not (1 <= month <= 12 and date.min.year <= year < date.max.year):
+        return Response({'error': 'Invalid month'}, status=status.HTTP_400_BAD_REQUEST)
+    first = date(year, month, 1)
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
     
-    for event in organized_events:
-        try:
-            rsvp = user_rsvps.filter(event=event).first()
-            event.user_rsvp = rsvp.status if rsvp else None
-        except:
-            event.user_rsvp = None
+    touching = EventDay.objects.filter(day__range=(first, last)).values('event_id')
+    events = (
+        Event.objects.visible_to(request.user).filter(pk__in=touching)
+        .only(*CALENDAR_FIELDS).order_by('start_time', 'id')
+    )
     
-    for event in rsvped_events:
-        try:
-            rsvp = user_rsvps.filter(event=event).first()
-            event.user_rsvp = rsvp.status if rsvp else None
-        except:
-            event.user_rsvp = None
+    days = {first + timedelta(days=offset): [] for offset in range((last - first).days + 1)}
+    for event in events:
+        summary = EventSummarySerializer(event).data
+        for day in event_days(event.start_time, event.end_time):
+            if day in days:
+                days[day].append(summary)
     
     return Response({
-        'organized_events': EventSerializer(organized_events, many=True, context={'request': request}).data,
-        'rsvped_events': EventSerializer(rsvped_events, many=True, context={'request': request}).data,
-        'rsvp_count': len(rsvped_events),
-        'organized_count': organized_events.count(),
+        'year': year,
+        'month': month,
+        'days': [{'date': day.isoformat(), 'events': summaries} for day, summaries in days.items()],
     })
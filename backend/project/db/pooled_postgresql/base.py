@@ -0,0 +1,92 @@
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from psycopg2 import Error as DatabaseError
+from psycopg2.extras import register_default_jsonb
+from psycopg2.pool import ThreadedConnectionPool
+
+# One psycopg2 pool per database alias and process. Django opens and closes
+# connections as usual; closing hands the connection back to the pool.
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    ThreadedConnectionPool that waits up to `timeout` seconds for a free
+    connection instead of raising as soon as it is exhausted.
+    """
+
+    def __init__(self, size, timeout, conn_params):
+        self.pool = ThreadedConnectionPool(1, size, **conn_params)
+        self.slots = threading.BoundedSemaphore(size)
+        self.timeout = timeout
+
+    def getconn(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise DatabaseError(f'No database connection became free within {self.timeout}s')
+        try:
+            return self.pool.getconn()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def putconn(self, connection, close=False):
+        try:
+            self.pool.putconn(connection, close=close or bool(connection.closed))
+        finally:
+            self.slots.release()
+
+
+def _is_usable(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except DatabaseError:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend (psycopg2) that borrows connections from a pool
+    sized by OPTIONS['pool_size'], waiting up to OPTIONS['pool_timeout']
+    seconds for one. With CONN_HEALTH_CHECKS, a borrowed connection is
+    checked before use and replaced if the server dropped it.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pool_size = params.pop('pool_size', 10)
+        self.pool_timeout = params.pop('pool_timeout', 30)
+        return params
+
+    def get_pool(self, conn_params):
+        with _pools_lock:
+            if self.alias not in _pools:
+                _pools[self.alias] = ConnectionPool(self.pool_size, self.pool_timeout, conn_params)
+            return _pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict['OPTIONS']
+        if 'isolation_level' in options:
+            raise ImproperlyConfigured('The pooled PostgreSQL backend does not support OPTIONS["isolation_level"].')
+        self.isolation_level = base.IsolationLevel.READ_COMMITTED
+
+        pool = self.get_pool(conn_params)
+        connection = pool.getconn()
+        if self.settings_dict['CONN_HEALTH_CHECKS'] and not _is_usable(connection):
+            pool.putconn(connection, close=True)
+            connection = pool.getconn()
+        # As in Django's backend: skip psycopg2's JSON decoding for JSONField.
+        register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                _pools[self.alias].putconn(self.connection)
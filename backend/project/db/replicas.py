@@ -0,0 +1,165 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.state import token_backend
+
+# Read-replica routing. ReplicaRoutingMiddleware decides per request whether
+# reads may go to a replica: only for safe methods, and only if the caller
+# has not written anything in the last REPLICA_STICKY_SECONDS. A request
+# reads from one replica, picked at random when it starts, so all of its
+# reads see the same replica's state. Everything outside a request
+# (management commands, shells) reads from the primary.
+
+PRIMARY = 'default'
+REPLICAS = getattr(settings, 'DATABASE_REPLICAS', [])
+STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica = ContextVar('replica', default=None)
+
+
+class ReplicaRouter:
+    """
+    Send reads to the current request's replica, if it has one, and
+    everything else to the primary. Replicas are never migrated; they get
+    their schema from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        # The database cache backend holds the stickiness markers themselves.
+        replica = _replica.get()
+        if replica is not None and model._meta.app_label != 'django_cache':
+            return replica
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in REPLICAS
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send the reads made inside the block to the primary, whatever the
+    request allows.
+    """
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def _sticky_key(user_id):
+    return f'db:primary:{user_id}'
+
+
+def token_user_id(raw_token):
+    """
+    The user id claimed by a JWT. It is not verified: it only decides where
+    reads go, and views still authenticate.
+    """
+    try:
+        return token_backend.decode(raw_token, verify=False).get(jwt_settings.USER_ID_CLAIM)
+    except Exception:
+        return None
+
+
+def _caller_id(request):
+    """
+    The user id claimed by the request's bearer token.
+    """
+    header = request.META.get(jwt_settings.AUTH_HEADER_NAME, '').split()
+    if len(header) != 2 or header[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    return token_user_id(header[1])
+
+
+def mark_writer(request, user_id):
+    """
+    Make `user_id` read from the primary for REPLICA_STICKY_SECONDS after
+    this request succeeds, as if they had written. For views that issue
+    tokens to a user the request is not authenticated as, such as a user
+    created by the request itself.
+    """
+    getattr(request, '_request', request)._replica_writer_id = user_id
+
+
+def _may_use_replica(request):
+    return bool(REPLICAS) and request.method in SAFE_METHODS
+
+
+def _pick_replica(allowed):
+    return random.choice(REPLICAS) if allowed else None
+
+
+def _written_by(request, response):
+    """
+    The id of the user whose write just succeeded, if any.
+    """
+    if not REPLICAS or request.method in SAFE_METHODS or response.status_code >= 400:
+        return None
+    writer_id = getattr(request, '_replica_writer_id', None)
+    if writer_id is not None:
+        return writer_id
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.id
+    return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Allow replica reads for safe-method requests unless the caller wrote
+    recently. After a successful write, that user reads from the primary
+    for REPLICA_STICKY_SECONDS, so they always see their own changes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        replica = _may_use_replica(request)
+        if replica:
+            user_id = _caller_id(request)
+            replica = user_id is None or cache.get(_sticky_key(user_id)) is None
+        token = _replica.set(_pick_replica(replica))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+        writer_id = _written_by(request, response)
+        if writer_id is not None:
+            cache.set(_sticky_key(writer_id), 1, STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        replica = _may_use_replica(request)
+        if replica:
+            user_id = _caller_id(request)
+            replica = user_id is None or await cache.aget(_sticky_key(user_id)) is None
+        token = _replica.set(_pick_replica(replica))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica.reset(token)
+        writer_id = _written_by(request, response)
+        if writer_id is not None:
+            await cache.aset(_sticky_key(writer_id), 1, STICKY_SECONDS)
+        return response
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'project.db.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,20 +83,154 @@ WSGI_APPLICATION = 'project.wsgi.application'
 
 
 # -------------------------
-# Database (sqlite3 - project-local)
+# Database
 # -------------------------
-# Use a DB file inside the project BASE_DIR (works on Windows and Linux)
-DB_PATH = BASE_DIR / "db.sqlite3"
-# Ensure parent directory exists (BASE_DIR exists already)
-os.makedirs(os.path.dirname(str(DB_PATH)), exist_ok=True)
-
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        # convert Path to str for widest compatibility
-        "NAME": str(DB_PATH),
+# DB_ENGINE=sqlite (default) uses a project-local file tuned for concurrent
+# web traffic: WAL journaling so readers never block the writer,
+# synchronous=NORMAL (safe with WAL), a busy timeout instead of immediate
+# "database is locked" errors, memory-mapped reads and a 64 MB page cache.
+# DB_ENGINE=postgres uses the DB_NAME / DB_USER / DB_PASSWORD / DB_HOST /
+# DB_PORT variables. Connections persist for DB_CONN_MAX_AGE seconds and
+# are health-checked before reuse; with DB_POOL_SIZE > 0 they come from a
+# per-process pool instead (project/db/pooled_postgresql).
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'event_management'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
     }
-}
+    if DB_POOL_SIZE:
+        # Pooled connections go back to the pool at the end of each request.
+        DATABASES['default'].update({
+            'ENGINE': 'project.db.pooled_postgresql',
+            'CONN_MAX_AGE': 0,
+        })
+        DATABASES['default']['OPTIONS'].update({
+            'pool_size': DB_POOL_SIZE,
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        })
+else:
+    # Use a DB file inside the project BASE_DIR (works on Windows and Linux).
+    # It is not tracked: create it with `python manage.py migrate`.
+    DB_PATH = Path(os.environ.get('DB_PATH', BASE_DIR / "db.sqlite3"))
+    # Ensure parent directory exists
+    os.makedirs(os.path.dirname(str(DB_PATH)), exist_ok=True)
+
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+        'temp_store': 'MEMORY',
+    }
+
+    DATABASES = {
+        "default": {
+            "ENGINE": "project.db.sqlite3",
+            # convert Path to str for widest compatibility
+            "NAME": str(DB_PATH),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "pragmas": SQLITE_PRAGMAS,
+            },
+        }
+    }
+
+# -------------------------
+# Read replicas
+# -------------------------
+# Safe-method requests read from a random replica; writes and everything
+# else use `default`. After a write, that user reads from the primary for
+# REPLICA_STICKY_SECONDS (see project/db/replicas.py). Replicas reuse the
+# primary's settings with a different file (DB_REPLICA_PATHS, SQLite) or
+# host (DB_REPLICA_HOSTS, PostgreSQL), comma-separated. Locally, two SQLite
+# files plus `python manage.py sync_replicas --interval 2` simulate a
+# replica that lags behind.
+if DB_ENGINE == 'postgres':
+    _replica_overrides = [{'HOST': host} for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
+else:
+    _replica_overrides = [{'NAME': path} for path in os.environ.get('DB_REPLICA_PATHS', '').split(',') if path]
+
+DATABASE_REPLICAS = []
+for _index, _override in enumerate(_replica_overrides, 1):
+    _alias = f'replica{_index}'
+    DATABASES[_alias] = {**DATABASES['default'], **_override, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['project.db.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+
+# -------------------------
+# Cache
+# -------------------------
+# Local memory by default. Set CACHE_BACKEND=file or CACHE_BACKEND=db when
+# running several worker processes so that they share cached responses
+# (the db backend needs `python manage.py createcachetable`).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'django_cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'event-management',
+        }
+    }
+
+# Seconds a cached anonymous events feed page is served before a refresh;
+# a stale copy keeps being served while one worker rebuilds it.
+EVENTS_FEED_CACHE_TIMEOUT = int(os.environ.get('EVENTS_FEED_CACHE_TIMEOUT', 30))
+EVENTS_FEED_STALE_TIMEOUT = int(os.environ.get('EVENTS_FEED_STALE_TIMEOUT', 600))
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 60))
+
+
+# -------------------------
+# Authentication
+# -------------------------
+# Logins accept a username or an email address (one indexed lookup).
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.EmailOrUsernameBackend',
+]
+# Threads used by the async login view to check password hashes.
+PASSWORD_CHECK_WORKERS = int(os.environ.get('PASSWORD_CHECK_WORKERS', 4))
+
+# JWT_STATELESS_READS=True lets read requests on the event endpoints
+# authenticate from the access token claims without loading the user.
+# USER_CACHE_SIZE > 0 keeps up to that many user rows per worker process for
+# USER_CACHE_TIMEOUT seconds; saving a user or profile evicts its entry.
+JWT_STATELESS_READS = os.environ.get('JWT_STATELESS_READS', 'False') == 'True'
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 0))
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60))
 
 
 # Password validation
@@ -150,6 +285,10 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 # ensure media dir exists
 os.makedirs(str(MEDIA_ROOT), exist_ok=True)
+# WebP thumbnails generated for every profile picture, and the number of
+# worker processes rendering them (0 renders inline, e.g. for tests).
+PROFILE_THUMBNAIL_SIZES = (64, 128, 256)
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -158,7 +297,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -173,7 +312,7 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
     'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': False,
+    'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': False,
 
     'ALGORITHM': 'HS256',
@@ -190,9 +329,10 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
 
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'AUTH_TOKEN_CLASSES': ('accounts.tokens.AccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_USER_CLASS': 'accounts.authentication.TokenUser',
 
     'JTI_CLAIM': 'jti',
 
@@ -202,6 +342,15 @@ SIMPLE_JWT = {
 }
 
 
+# Revoked JWTs (accounts.revocation). Run `python manage.py
+# purge_revoked_tokens` periodically (e.g. hourly from cron) to delete rows
+# for tokens that have expired.
+REVOKED_TOKENS_BLOOM_CAPACITY = int(os.environ.get('REVOKED_TOKENS_BLOOM_CAPACITY', 1000000))
+REVOKED_TOKENS_BLOOM_ERROR_RATE = float(os.environ.get('REVOKED_TOKENS_BLOOM_ERROR_RATE', 0.001))
+REVOKED_TOKENS_SYNC_INTERVAL = int(os.environ.get('REVOKED_TOKENS_SYNC_INTERVAL', 5))
+REVOKED_TOKENS_REBUILD_INTERVAL = int(os.environ.get('REVOKED_TOKENS_REBUILD_INTERVAL', 3600))
+
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
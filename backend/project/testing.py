@@ -0,0 +1,11 @@
+from accounts.tokens import AccessToken
+
+# Helpers shared by the apps' tests.
+
+
+def bearer(user):
+    """
+    Request headers carrying an access token for `user`, as the test
+    clients' and RequestFactory's `headers=` argument takes them.
+    """
+    return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
@@ -0,0 +1,257 @@
+import os
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from .db import replicas
+from .db.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from .testing import bearer
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+
+def database(alias, **settings_dict):
+    """
+    An unregistered connection for `alias` configured like a DATABASES entry.
+    """
+    return connections.configure_settings({'default': {}, alias: settings_dict})[alias]
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    def test_pragmas_are_applied_on_connect(self):
+        pragmas = {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 1234,
+            'cache_size': -2048,
+            'temp_store': 'MEMORY',
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = SQLiteDatabaseWrapper(database(
+                'pragmas', ENGINE='project.db.sqlite3', NAME=os.path.join(directory, 'db.sqlite3'),
+                OPTIONS={'pragmas': pragmas},
+            ), 'pragmas')
+            try:
+                with wrapper.cursor() as cursor:
+                    applied = {}
+                    for name in pragmas:
+                        cursor.execute(f'PRAGMA {name}')
+                        applied[name] = cursor.fetchone()[0]
+            finally:
+                wrapper.close()
+        # synchronous NORMAL is 1 and temp_store MEMORY is 2.
+        self.assertEqual(applied, {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 1234, 'cache_size': -2048, 'temp_store': 2,
+        })
+
+    def test_project_settings_use_the_backend(self):
+        if getattr(settings, 'DB_ENGINE', 'sqlite') != 'sqlite':
+            self.skipTest('Not using SQLite')
+        self.assertEqual(settings.DATABASES['default']['ENGINE'], 'project.db.sqlite3')
+        self.assertEqual(settings.DATABASES['default']['OPTIONS']['pragmas'], settings.SQLITE_PRAGMAS)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+
+
+class FakePool:
+    """
+    Stands in for psycopg2's ThreadedConnectionPool.
+    """
+
+    def __init__(self, minconn, maxconn, **conn_params):
+        self.idle = []
+        self.discarded = []
+
+    def getconn(self):
+        return self.idle.pop() if self.idle else FakeConnection()
+
+    def putconn(self, connection, close=False):
+        (self.discarded if close else self.idle).append(connection)
+
+
+@skipUnless(psycopg2, 'The pooled backend needs psycopg2')
+@mock.patch('project.db.pooled_postgresql.base.ThreadedConnectionPool', FakePool)
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        from .db.pooled_postgresql import base
+
+        self.base = base
+
+    def test_connections_are_returned_and_reused(self):
+        pool = self.base.ConnectionPool(2, 0.01, {})
+        first = pool.getconn()
+        pool.putconn(first)
+        self.assertIs(pool.getconn(), first)
+
+    def test_checkout_waits_for_a_free_slot(self):
+        pool = self.base.ConnectionPool(2, 0.01, {})
+        first, second = pool.getconn(), pool.getconn()
+        with self.assertRaisesMessage(self.base.DatabaseError, 'No database connection became free'):
+            pool.getconn()
+
+        pool.timeout = 5
+        returned = threading.Timer(0.05, pool.putconn, [first])
+        returned.start()
+        self.assertIs(pool.getconn(), first)
+        returned.join()
+        pool.putconn(second)
+
+    def test_closed_connections_are_discarded(self):
+        pool = self.base.ConnectionPool(1, 0.01, {})
+        connection = pool.getconn()
+        connection.closed = 1
+        pool.putconn(connection)
+        self.assertEqual(pool.pool.discarded, [connection])
+        # The slot is free again.
+        self.assertIsNot(pool.getconn(), connection)
+
+    def test_failed_checkout_frees_its_slot(self):
+        pool = self.base.ConnectionPool(1, 0.01, {})
+        with mock.patch.object(FakePool, 'getconn', side_effect=self.base.DatabaseError('refused')):
+            with self.assertRaises(self.base.DatabaseError):
+                pool.getconn()
+        pool.getconn()
+
+    def test_backend_borrows_and_returns_connections(self):
+        wrapper = self.base.DatabaseWrapper(database(
+            'pooled', ENGINE='project.db.pooled_postgresql', NAME='events', CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=True,
+            OPTIONS={'pool_size': 1, 'pool_timeout': 0.01},
+        ), 'pooled')
+        self.addCleanup(self.base._pools.pop, 'pooled', None)
+        conn_params = wrapper.get_connection_params()
+        with mock.patch.object(self.base, 'register_default_jsonb'), \
+                mock.patch.object(self.base, '_is_usable', side_effect=[False, True]):
+            connection = wrapper.get_new_connection(conn_params)
+            pool = self.base._pools['pooled']
+            # The first connection failed its health check and was replaced.
+            self.assertEqual(len(pool.pool.discarded), 1)
+            self.assertIsNot(pool.pool.discarded[0], connection)
+
+            wrapper.connection = connection
+            wrapper._close()
+            self.assertEqual(pool.pool.idle, [connection])
+            self.assertIs(wrapper.get_new_connection(conn_params), connection)
+
+
+def model(app_label):
+    return SimpleNamespace(_meta=SimpleNamespace(app_label=app_label))
+
+
+EVENT = model('events')
+
+
+@mock.patch.object(replicas, 'REPLICAS', ['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+
+    def test_reads_use_the_primary_unless_the_request_allows_replicas(self):
+        self.assertEqual(self.router.db_for_read(EVENT), 'default')
+        token = replicas._replica.set('replica2')
+        try:
+            self.assertEqual(self.router.db_for_read(EVENT), 'replica2')
+            # The database cache holds the stickiness markers.
+            self.assertEqual(self.router.db_for_read(model('django_cache')), 'default')
+            with replicas.primary_reads():
+                self.assertEqual(self.router.db_for_read(EVENT), 'default')
+            self.assertEqual(self.router.db_for_read(EVENT), 'replica2')
+        finally:
+            replicas._replica.reset(token)
+
+    def test_writes_and_migrations_use_the_primary(self):
+        token = replicas._replica.set('replica1')
+        try:
+            self.assertEqual(self.router.db_for_write(EVENT), 'default')
+        finally:
+            replicas._replica.reset(token)
+        self.assertTrue(self.router.allow_migrate('default', 'events'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'events'))
+
+
+@mock.patch.object(replicas, 'REPLICAS', ['replica1'])
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.reads = []
+        self.user = SimpleNamespace(id=7, is_authenticated=True)
+        self.other = SimpleNamespace(id=8, is_authenticated=True)
+
+    def respond(self, request, status=200):
+        self.reads.append(replicas.ReplicaRouter().db_for_read(EVENT))
+        request.user = self.user
+        return HttpResponse(status=status)
+
+    def read_from(self, request, status=200):
+        self.reads.clear()
+        replicas.ReplicaRoutingMiddleware(lambda request: self.respond(request, status))(request)
+        return self.reads[0]
+
+    def test_only_safe_methods_read_from_replicas(self):
+        self.assertEqual(self.read_from(self.factory.get('/api/events/')), 'replica1')
+        self.assertEqual(self.read_from(self.factory.head('/api/events/')), 'replica1')
+        self.assertEqual(self.read_from(self.factory.post('/api/events/'), status=400), 'default')
+        # Nothing leaks out of the request.
+        self.assertEqual(replicas.ReplicaRouter().db_for_read(EVENT), 'default')
+
+    def test_a_request_reads_from_one_replica(self):
+        aliases = [f'replica{index}' for index in range(1, 9)]
+
+        def get_response(request):
+            for _ in range(20):
+                self.reads.append(replicas.ReplicaRouter().db_for_read(EVENT))
+            return HttpResponse()
+
+        with mock.patch.object(replicas, 'REPLICAS', aliases):
+            chosen = set()
+            for _ in range(10):
+                self.reads.clear()
+                replicas.ReplicaRoutingMiddleware(get_response)(self.factory.get('/api/events/'))
+                self.assertEqual(len(set(self.reads)), 1)
+                chosen.update(self.reads)
+        self.assertLessEqual(chosen, set(aliases))
+        self.assertGreater(len(chosen), 1)
+
+    def test_writers_read_from_the_primary_for_a_while(self):
+        self.assertEqual(self.read_from(self.factory.get('/api/events/', headers=bearer(self.user))), 'replica1')
+        self.read_from(self.factory.post('/api/events/'), status=201)
+        self.assertEqual(self.read_from(self.factory.get('/api/events/', headers=bearer(self.user))), 'default')
+        # Other callers are unaffected.
+        self.assertEqual(self.read_from(self.factory.get('/api/events/', headers=bearer(self.other))), 'replica1')
+        self.assertEqual(self.read_from(self.factory.get('/api/events/')), 'replica1')
+
+        cache.delete(replicas._sticky_key(7))
+        self.assertEqual(self.read_from(self.factory.get('/api/events/', headers=bearer(self.user))), 'replica1')
+
+    def test_failed_writes_are_not_sticky(self):
+        self.read_from(self.factory.post('/api/events/'), status=400)
+        self.assertEqual(self.read_from(self.factory.get('/api/events/', headers=bearer(self.user))), 'replica1')
+
+    def test_invalid_bearer_tokens_are_ignored(self):
+        self.read_from(self.factory.post('/api/events/'), status=201)
+        request = self.factory.get('/api/events/', HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.read_from(request), 'replica1')
+
+    async def test_async_requests(self):
+        async def get_response(request):
+            return self.respond(request, 201 if request.method == 'POST' else 200)
+
+        middleware = replicas.ReplicaRoutingMiddleware(get_response)
+        await middleware(self.factory.get('/api/events/', headers=bearer(self.user)))
+        await middleware(self.factory.post('/api/events/'))
+        await middleware(self.factory.get('/api/events/', headers=bearer(self.user)))
+        await middleware(self.factory.get('/api/events/', headers=bearer(self.other)))
+        self.assertEqual(self.reads, ['replica1', 'default', 'default', 'replica1'])